@@ -0,0 +1,455 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import asyncio
+from datetime import datetime
+from typing import Any, Iterable, Optional, Union
+
+import eetlijst
+
+from .client import (
+    BASE_URL,
+    _check_limit,
+    _check_timestamp,
+    _is_session_expired,
+    _noticeboard_data,
+    _post_payload,
+    _session_from_login,
+    _status_data,
+    _status_steps,
+)
+from .exceptions import LoginError, SessionError
+from .models import MainPageSnapshot, StatusRow, now, timeout
+from .parsing import get_parser, parse_main_page
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+class AsyncResponse(object):
+    """
+    Represent a fully read HTTP response.
+    """
+
+    __slots__ = ("status_code", "url", "content")
+
+    def __init__(self, status_code: int, url: str, content: bytes) -> None:
+        self.status_code = status_code
+        self.url = url
+        self.content = content
+
+
+class AsyncTransport(object):
+    """
+    Base class for the HTTP layer of an `AsyncEetlijst` client. It mirrors
+    `Transport`, except that the methods are coroutines.
+    """
+
+    __slots__ = ()
+
+    async def get(self, url: str, params: Optional[dict[str, Any]] = None) -> Any:
+        """
+        Perform a GET request.
+        """
+
+        raise NotImplementedError
+
+    async def post(self, url: str, data: Optional[dict[str, Any]] = None) -> Any:
+        """
+        Perform a POST request.
+        """
+
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """
+        Release all resources held by this transport.
+        """
+
+        pass
+
+
+class AiohttpTransport(AsyncTransport):
+    """
+    Transport backed by an `aiohttp.ClientSession`. The number of requests in
+    flight is bounded by `concurrency`, which also applies when the transport
+    is shared between many clients.
+    """
+
+    __slots__ = ("pool_size", "semaphore", "session", "timeout")
+
+    def __init__(
+        self,
+        concurrency: int = 10,
+        pool_size: int = 100,
+        timeout: Optional[float] = 30.0,
+    ) -> None:
+        if aiohttp is None:
+            raise ImportError("The aiohttp package is required for this transport.")
+
+        self.pool_size = pool_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.session = None
+        self.timeout = timeout
+
+    async def get(
+        self, url: str, params: Optional[dict[str, Any]] = None
+    ) -> AsyncResponse:
+        return await self._request("GET", url, params=_encode(params))
+
+    async def post(
+        self, url: str, data: Optional[dict[str, Any]] = None
+    ) -> AsyncResponse:
+        return await self._request("POST", url, data=_encode(data))
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        # The session must be created from within a running event loop.
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+        async with self.semaphore:
+            async with self.session.request(method, url, **kwargs) as response:
+                return AsyncResponse(
+                    response.status, str(response.url), await response.read()
+                )
+
+
+def _encode(values: Optional[dict[str, Any]]) -> Optional[list[tuple[str, str]]]:
+    # Unlike requests, aiohttp only accepts strings as values.
+    if values is None:
+        return None
+
+    result = []
+
+    for key, value in values.items():
+        if isinstance(value, (list, tuple)):
+            result.extend((key, str(item)) for item in value)
+        else:
+            result.append((key, str(value)))
+
+    return result
+
+
+class AsyncEetlijst(object):
+    """
+    Eetlijst client for use with asyncio. It offers the same functionality as
+    `Eetlijst`, and shares its parsing code.
+    """
+
+    __slots__ = (
+        "username",
+        "password",
+        "session",
+        "cache",
+        "transport",
+        "owns_transport",
+        "parser",
+        "lock",
+    )
+
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        session_id: str = None,
+        transport: Optional[AsyncTransport] = None,
+        parser: Optional[str] = None,
+    ) -> None:
+        """
+        Construct a new asynchronous Eetlijst client. Login is deferred until
+        the first action is executed, or until `login()` is awaited.
+
+        Share one transport between clients to bound the total number of
+        requests in flight. If none is given, an `AiohttpTransport` is created.
+        The `parser` selects the HTML parser backend, like for `Eetlijst`.
+        """
+
+        if username is None and password is None and session_id is None:
+            raise LoginError("No username/password or session identifier provided.")
+
+        self.username = username
+        self.password = password
+
+        self.session = None
+        self.cache = {}
+
+        self.transport = transport or AiohttpTransport()
+        self.owns_transport = transport is None
+
+        self.parser = get_parser(parser) if parser else None
+
+        # Session renewal should happen at most once at a time.
+        self.lock = asyncio.Lock()
+
+        # Store given session identifier.
+        if session_id:
+            self.session = (session_id, timeout(seconds=eetlijst.TIMEOUT_SESSION))
+
+    async def __aenter__(self) -> "AsyncEetlijst":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Close the transport, if it was created by this client.
+        """
+
+        if self.owns_transport:
+            await self.transport.close()
+
+    async def login(self) -> None:
+        """
+        Ensure that a valid session exists. If a session identifier was given,
+        then it is tested by retrieving the main page.
+        """
+
+        if self.session is not None:
+            await self._main_page()
+        else:
+            await self._get_session()
+
+    def clear_cache(self) -> None:
+        """
+        Clear the internal cache and reset session.
+        """
+
+        self.session = None
+        self.cache = {}
+
+    def get_session_id(self) -> Optional[str]:
+        """
+        Return the current session identifier, or `None` if not available.
+        """
+
+        if self.session is None or self.session[1] < now():
+            return None
+
+        return self.session[0]
+
+    async def get_snapshot(self) -> MainPageSnapshot:
+        """
+        Return the parsed main page. Compare two snapshots with `diff` to find
+        the statuses that changed in between.
+        """
+
+        return await self._get_snapshot()
+
+    async def get_name(self) -> str:
+        """
+        Get the name of the Eetlijst list.
+        """
+
+        return (await self._get_snapshot()).name
+
+    async def get_residents(self) -> list[str]:
+        """
+        Return all users listed on the Eetlijst list.
+        """
+
+        return list((await self._get_snapshot()).residents)
+
+    async def get_noticeboard(self) -> str:
+        """
+        Return the contents of the noticeboard.
+        """
+
+        return (await self._get_snapshot()).noticeboard
+
+    async def set_noticeboard(self, message: str) -> None:
+        """
+        Update the contents of the noticeboard.
+        """
+
+        await self._main_page(post=True, data=_noticeboard_data(message))
+
+    async def get_statuses(self, limit: Optional[int] = None) -> list[StatusRow]:
+        """
+        Return the diner status of the residents for one or multiple days,
+        starting today. All rows are returned if `limit` is None or zero.
+        """
+
+        limit = _check_limit(limit)
+
+        return (await self._get_snapshot()).statuses[:limit]
+
+    async def set_status(
+        self, resident_index: int, value: Optional[int], timestamp: datetime
+    ) -> bool:
+        """
+        Set the status for a given resident_index and timestamp in the future.
+        The timestamp should point to an extact row in the Eetlijst list.
+
+        Return True if the page returned after the change shows the new value.
+        """
+
+        _check_timestamp(timestamp)
+
+        for what in _status_steps(value):
+            await self._main_page(
+                post=True, data=_status_data(resident_index, [timestamp], what)
+            )
+
+        # Verify the change using the page returned by the last request.
+        try:
+            return (await self._get_snapshot()).get_value(
+                timestamp, resident_index
+            ) == value
+        except (KeyError, IndexError):
+            return False
+
+    async def get_status(
+        self, resident_index: int, timestamp: datetime
+    ) -> Optional[int]:
+        """
+        Return the status for a given date in the future. The timestamp should
+        point to an extact row in the Eetlijst list.
+        """
+
+        _check_timestamp(timestamp)
+
+        try:
+            return (await self._get_snapshot()).get_value(timestamp, resident_index)
+        except KeyError:
+            raise ValueError("Timestamp does not point to a row.")
+
+    async def _get_snapshot(self) -> MainPageSnapshot:
+        content = await self._main_page()
+
+        # Parse the page only once, and store the result next to the page. The
+        # cache may have been cleared in the mean time.
+        entry = self.cache.get("main_page")
+
+        if entry and entry[0] == content and entry[2] is not None:
+            return entry[2]
+
+        snapshot = parse_main_page(content, parser=self.parser)
+
+        if entry and entry[0] == content:
+            self.cache["main_page"] = (content, entry[1], snapshot)
+
+        return snapshot
+
+    async def _login(self) -> None:
+        # Verify username and password.
+        if self.username is None and self.password is None:
+            raise LoginError("Cannot login without username and password.")
+
+        payload = {"login": self.username, "pass": self.password}
+        response = await self.transport.get(BASE_URL + "login.php", params=payload)
+
+        self.session = (
+            _session_from_login(response.status_code, response.url),
+            timeout(seconds=eetlijst.TIMEOUT_SESSION),
+        )
+
+        # Login redirects to main page, so cache it.
+        self.cache["main_page"] = (
+            response.content,
+            timeout(seconds=eetlijst.TIMEOUT_CACHE),
+            None,
+        )
+
+    async def _get_session(self) -> str:
+        async with self.lock:
+            if self.session is None or self.session[1] < now():
+                self.session = None
+                await self._login()
+
+            return self.session[0]
+
+    async def _main_page(
+        self,
+        is_retry: bool = False,
+        data: Optional[dict[str, Union[str, int]]] = None,
+        post: bool = False,
+    ) -> bytes:
+        if data is None:
+            data = {}
+
+        cached = None
+
+        # Other coroutines may reset the session while this one is waiting, so
+        # the session identifier is kept.
+        session_id = await self._get_session()
+
+        # Prepare request.
+        if post:
+            payload = _post_payload(session_id, data)
+            response = await self.transport.post(BASE_URL + "main.php", data=payload)
+        else:
+            payload = {"session_id": session_id}
+            payload.update(data)
+
+            entry = self.cache.get("main_page")
+
+            if entry and now() < entry[1]:
+                cached = entry
+                response = entry[0]
+            else:
+                response = await self.transport.get(
+                    BASE_URL + "main.php", params=payload
+                )
+
+        if not cached:
+            # Session expired.
+            if _is_session_expired(response.status_code, response.url):
+                self.clear_cache()
+
+                # Determine to retry or not.
+                if is_retry:
+                    raise SessionError("Unable to retrieve page: main.php")
+                else:
+                    return await self._main_page(is_retry=True, data=data, post=post)
+
+            response = response.content
+
+        # Update cache and session. A cached page keeps its expiry, so that it
+        # is retrieved again in time, however often it is used.
+        self.session = (session_id, timeout(seconds=eetlijst.TIMEOUT_SESSION))
+
+        if not cached:
+            self.cache["main_page"] = (
+                response,
+                timeout(seconds=eetlijst.TIMEOUT_CACHE),
+                None,
+            )
+
+        return response
+
+
+async def gather_statuses(
+    clients: Iterable[AsyncEetlijst],
+    limit: Optional[int] = None,
+    concurrency: int = 10,
+    return_exceptions: bool = False,
+) -> list[Union[list[StatusRow], BaseException]]:
+    """
+    Retrieve the statuses of many lists concurrently, with at most
+    `concurrency` lists being retrieved at the same time. The results are in
+    the same order as the clients.
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _get_statuses(client):
+        async with semaphore:
+            return await client.get_statuses(limit=limit)
+
+    return await asyncio.gather(
+        *[_get_statuses(client) for client in clients],
+        return_exceptions=return_exceptions,
+    )
@@ -0,0 +1,230 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+from .client import Eetlijst
+from .models import TZ_UTC, StatusRow
+from .store import _sqlite_connection
+
+# Aggregates of the values of a resident, in the same terms as StatusSummary.
+_TOTALS = """
+    SELECT
+        residents.name,
+        COUNT(*),
+        TOTAL(CASE WHEN value != 0 THEN abs(value) ELSE 0 END),
+        TOTAL(value > 0),
+        TOTAL(value < 0),
+        TOTAL(CASE WHEN value != 0 THEN abs(value) - 1 ELSE 0 END),
+        TOTAL(value = 0),
+        TOTAL(value IS NULL)
+    FROM statuses
+    JOIN residents ON residents.id = statuses.resident
+    WHERE residents.list = ? AND statuses.day >= ? AND statuses.day < ?
+    GROUP BY residents.id
+    ORDER BY residents.id
+"""
+
+
+class ArchiveTotals(object):
+    """
+    Aggregates of the archived statuses of one resident:
+
+    days -> Number of days with a status (including unknown statuses)
+    count -> Number of people the resident attended dinner with, including
+             guests
+    cooks -> Number of days the resident cooked
+    diners -> Number of days the resident joined dinner without cooking
+    guests -> Number of guests
+    absent -> Number of days the resident did not attend dinner
+    unknown -> Number of days the status was not set
+    """
+
+    __slots__ = ("days", "count", "cooks", "diners", "guests", "absent", "unknown")
+
+    def __init__(self, days, count, cooks, diners, guests, absent, unknown) -> None:
+        self.days = days
+        self.count = count
+        self.cooks = cooks
+        self.diners = diners
+        self.guests = guests
+        self.absent = absent
+        self.unknown = unknown
+
+    def __repr__(self) -> str:
+        return "ArchiveTotals(%s)" % ", ".join(
+            "%s=%s" % (name, getattr(self, name)) for name in self.__slots__
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ArchiveTotals):
+            return NotImplemented
+
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+
+class Archive(object):
+    """
+    Keep the history of the dinner statuses in a SQLite database, since
+    Eetlijst.nl only shows today and the days ahead.
+
+    There is one record per day and resident, holding the last value seen.
+    Recording rows that did not change does not write anything. Records are
+    never deleted, so days that disappeared from the page keep their last
+    value. Residents are identified by their name, per list.
+
+    Connections are not shared between threads.
+    """
+
+    __slots__ = ("path", "timeout", "local", "fingerprints")
+
+    def __init__(self, path: str, timeout: float = 30.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+        # Fingerprint of the last recorded table, per list.
+        self.fingerprints = {}
+
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS residents "
+                "(id INTEGER PRIMARY KEY, list TEXT NOT NULL, name TEXT NOT NULL, "
+                "UNIQUE (list, name))"
+            )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS statuses "
+                "(resident INTEGER NOT NULL REFERENCES residents (id), "
+                "day INTEGER NOT NULL, value INTEGER, "
+                "PRIMARY KEY (resident, day)) WITHOUT ROWID"
+            )
+
+    def close(self) -> None:
+        """
+        Close the connection of the current thread.
+        """
+
+        connection = getattr(self.local, "connection", None)
+
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def record(
+        self, residents: list[str], rows: Iterable[StatusRow], list_name: str = ""
+    ) -> int:
+        """
+        Record the status rows of a list, with the resident names in the same
+        order as the statuses. A StatusTable can be given as rows. Return the
+        number of records that were added or changed.
+        """
+
+        # A table parsed from the same HTML as the previous one has not changed.
+        fingerprint = getattr(rows, "fingerprint", None)
+
+        if fingerprint is not None and self.fingerprints.get(list_name) == fingerprint:
+            return 0
+
+        with self._connection() as connection:
+            ids = [self._resident_id(connection, list_name, name) for name in residents]
+
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT INTO statuses (resident, day, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (resident, day) DO UPDATE SET value = excluded.value "
+                "WHERE value IS NOT excluded.value",
+                (
+                    (ids[index], int(row.timestamp.timestamp()), status.value)
+                    for row in rows
+                    for index, status in enumerate(row.statuses)
+                ),
+            )
+            changes = connection.total_changes - before
+
+        if fingerprint is not None:
+            self.fingerprints[list_name] = fingerprint
+
+        return changes
+
+    def record_client(self, client: Eetlijst, list_name: Optional[str] = None) -> int:
+        """
+        Record the statuses shown by a client. The list defaults to the name of
+        the list. Return the number of records that were added or changed.
+        """
+
+        snapshot = client.get_snapshot()
+
+        return self.record(
+            snapshot.residents,
+            snapshot.statuses,
+            list_name=snapshot.name if list_name is None else list_name,
+        )
+
+    def iter_statuses(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        list_name: str = "",
+    ) -> Iterator[tuple[datetime, str, Optional[int]]]:
+        """
+        Iterate over the records of a list between `start` (inclusive) and
+        `end` (exclusive), ordered by day. Each record is a tuple of
+        (timestamp, resident name, value). Records are read while iterating.
+        """
+
+        cursor = self._connection().execute(
+            "SELECT statuses.day, residents.name, statuses.value FROM statuses "
+            "JOIN residents ON residents.id = statuses.resident "
+            "WHERE residents.list = ? AND statuses.day >= ? AND statuses.day < ? "
+            "ORDER BY statuses.day, residents.id",
+            (list_name, *_range(start, end)),
+        )
+
+        for day, name, value in cursor:
+            yield datetime.fromtimestamp(day, tz=TZ_UTC), name, value
+
+    def totals(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        list_name: str = "",
+    ) -> dict[str, ArchiveTotals]:
+        """
+        Return the aggregates per resident of a list between `start`
+        (inclusive) and `end` (exclusive), keyed by resident name. The
+        aggregates are computed by SQLite.
+        """
+
+        cursor = self._connection().execute(_TOTALS, (list_name, *_range(start, end)))
+
+        return {
+            name: ArchiveTotals(*(int(value) for value in values))
+            for name, *values in cursor
+        }
+
+    def _resident_id(self, connection: sqlite3.Connection, list_name: str, name: str):
+        connection.execute(
+            "INSERT OR IGNORE INTO residents (list, name) VALUES (?, ?)",
+            (list_name, name),
+        )
+
+        return connection.execute(
+            "SELECT id FROM residents WHERE list = ? AND name = ?", (list_name, name)
+        ).fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        return _sqlite_connection(self.local, self.path, self.timeout)
+
+
+def _range(start: Optional[datetime], end: Optional[datetime]) -> tuple[int, int]:
+    return (
+        -(2**63) if start is None else int(start.timestamp()),
+        2**63 - 1 if end is None else int(end.timestamp()),
+    )
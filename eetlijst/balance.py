@@ -0,0 +1,203 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import itertools
+from datetime import datetime
+from fractions import Fraction
+from typing import Iterable, Optional
+
+from .archive import Archive
+from .models import StatusRow, StatusTable
+
+
+class ResidentBalance(object):
+    """
+    Totals of one resident:
+
+    cooks -> Number of days the resident cooked
+    diners -> Number of days the resident joined dinner without cooking
+    guests -> Number of guests the resident brought
+    absent -> Number of days the resident did not attend dinner
+    points -> Points balance. A cook earns one point per person that attended
+              dinner (shared equally between cooks), and everyone pays one
+              point per person they brought to dinner, including themselves.
+              Days without a cook are not counted.
+    """
+
+    __slots__ = ("cooks", "diners", "guests", "absent", "_points")
+
+    def __init__(self) -> None:
+        self.cooks = 0
+        self.diners = 0
+        self.guests = 0
+        self.absent = 0
+
+        # Shares of cooks are fractions. These are kept exact, so adding and
+        # removing days any number of times does not accumulate rounding errors.
+        self._points = Fraction(0)
+
+    def __repr__(self) -> str:
+        return "ResidentBalance(%s)" % ", ".join(
+            "%s=%s" % (name, getattr(self, name))
+            for name in ("cooks", "diners", "guests", "absent", "points")
+        )
+
+    @property
+    def points(self) -> float:
+        """
+        Points balance of the resident.
+        """
+
+        return float(self._points)
+
+    def get_ratio(self) -> Optional[float]:
+        """
+        Return the fraction of the dinners attended that the resident cooked,
+        or None if the resident never attended dinner.
+        """
+
+        attended = self.cooks + self.diners
+
+        return self.cooks / attended if attended else None
+
+
+class Balance(object):
+    """
+    Compute the totals and points balance per resident over a status history.
+
+    The balance is updated incrementally: adding or changing a day takes time
+    proportional to the number of residents, independent of the length of the
+    history. Days are identified by their timestamp, so recording a day again
+    (e.g. from a later poll) replaces its previous contribution. Residents are
+    identified by their name.
+    """
+
+    __slots__ = ("residents", "days")
+
+    def __init__(self) -> None:
+        self.residents = {}
+
+        # The statuses of each day that was added, to undo its contribution.
+        self.days = {}
+
+    def __repr__(self) -> str:
+        return "Balance(days=%d, residents=%d)" % (len(self.days), len(self.residents))
+
+    def __getitem__(self, name: str) -> ResidentBalance:
+        return self.residents[name]
+
+    def set_day(self, timestamp: datetime, statuses: dict[str, Optional[int]]) -> None:
+        """
+        Add or replace the statuses of one day, given as a mapping of resident
+        name to status value.
+        """
+
+        self._set_day(int(timestamp.timestamp()), dict(statuses))
+
+    def remove_day(self, timestamp: datetime) -> None:
+        """
+        Remove the statuses of one day, if it was added.
+        """
+
+        previous = self.days.pop(int(timestamp.timestamp()), None)
+
+        if previous is not None:
+            self._apply(previous, -1)
+
+    def update(self, residents: list[str], rows: Iterable[StatusRow]) -> None:
+        """
+        Add or replace the days of the given status rows, with the resident
+        names in the same order as the statuses. A StatusTable can be given as
+        rows.
+        """
+
+        if isinstance(rows, StatusTable):
+            # Read the values directly, without creating StatusRows.
+            size = rows.residents
+            values = rows.values
+
+            for index, timestamp in enumerate(rows.timestamps):
+                start = index * size
+                end = start + size
+
+                self._set_day(
+                    timestamp,
+                    {
+                        name: None if value == StatusTable.NONE else value
+                        for name, value in zip(residents, values[start:end])
+                    },
+                )
+        else:
+            for row in rows:
+                self.set_day(
+                    row.timestamp,
+                    {
+                        name: status.value
+                        for name, status in zip(residents, row.statuses)
+                    },
+                )
+
+    def update_archive(
+        self,
+        archive: Archive,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        list_name: str = "",
+    ) -> None:
+        """
+        Add or replace the days of a list in an archive, between `start`
+        (inclusive) and `end` (exclusive).
+        """
+
+        records = archive.iter_statuses(start, end, list_name=list_name)
+
+        for timestamp, group in itertools.groupby(records, key=lambda x: x[0]):
+            self.set_day(timestamp, {name: value for _, name, value in group})
+
+    def _set_day(self, key: int, statuses: dict[str, Optional[int]]) -> None:
+        previous = self.days.get(key)
+
+        if previous == statuses:
+            return
+
+        if previous is not None:
+            self._apply(previous, -1)
+
+        self.days[key] = statuses
+        self._apply(statuses, 1)
+
+    def _apply(self, statuses: dict[str, Optional[int]], sign: int) -> None:
+        count = cooks = 0
+
+        for value in statuses.values():
+            if value:
+                count += abs(value)
+                cooks += value > 0
+
+        share = Fraction(count, cooks) if cooks else 0
+
+        for name, value in statuses.items():
+            resident = self.residents.get(name)
+
+            if resident is None:
+                resident = self.residents[name] = ResidentBalance()
+
+            if value is None:
+                continue
+            elif value == 0:
+                resident.absent += sign
+                continue
+            elif value > 0:
+                resident.cooks += sign
+                earned = share
+            else:
+                value = -value
+                resident.diners += sign
+                earned = 0
+
+            resident.guests += sign * (value - 1)
+
+            if cooks:
+                resident._points += sign * (earned - value)
@@ -0,0 +1,498 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+"""
+Benchmarks for scraping and session management.
+
+Run `python -m eetlijst.bench` to benchmark against synthetic pages, and
+optionally against recorded pages (e.g. `--pages tests/data`). The results are
+written as JSON, so they can be compared between releases.
+"""
+
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+import eetlijst
+
+SESSION_ID = "bc731753a2d0fecccf12518759108b5b"
+
+IMAGES = {
+    None: '<img src="leeg.gif" width="50" height="20" title="Klik hier">',
+    0: '<img src="nop.gif" title="{name} eet NIET mee">',
+    -1: '<img src="eet.gif" title="{name} eet mee">',
+    1: '<img src="kook.gif" title="{name} kookt">',
+}
+
+
+def generate_page(
+    residents: int = 5,
+    days: int = 7,
+    deadline: bool = True,
+    seed: int = 0,
+    start: Optional[datetime] = None,
+) -> bytes:
+    """
+    Generate a main page with the given number of residents and days, that has
+    the same structure as the actual Eetlijst.nl page. Statuses are random, but
+    deterministic for a given seed.
+    """
+
+    rng = random.Random(seed)
+    start = start or datetime(2014, 3, 28, 23, tzinfo=eetlijst.TZ_UTC)
+    names = ["Resident%d" % index for index in range(residents)]
+
+    header = [
+        '<th width="80" height="20">&nbsp;</th>',
+        '<th><img src="tijd.gif" title="Sluitingstijd"></th>' if deadline else "",
+    ]
+
+    for index, name in enumerate(names):
+        header.append(
+            '<th width="80"><a class="th" href="javascript:popup(%d);" '
+            'title="Meer informatie over %s"><nobr><b>%s</b></nobr></a></th>'
+            % (index, name, name)
+        )
+
+    rows = ["<tr>%s</tr>" % "".join(header)]
+
+    for day in range(days):
+        timestamp = int((start + timedelta(days=day)).timestamp())
+        cells = ['<td class="r"><nobr>&nbsp;dag&nbsp;</nobr></td>']
+
+        if deadline:
+            cells.append(
+                '<td><font size="1"><a href="javascript:vs(%d);">16:00</a></td>'
+                % timestamp
+            )
+
+        for index, name in enumerate(names):
+            value = rng.choice([None, None, 0, -1, -1, -1, -2, 1, 2])
+
+            if value in IMAGES:
+                images = IMAGES[value].format(name=name)
+            elif value < 0:
+                images = "%d X %s" % (-value, IMAGES[-1].format(name=name))
+            else:
+                images = "%s + %d X %s" % (
+                    IMAGES[1].format(name=name),
+                    value - 1,
+                    IMAGES[-1].format(name=name),
+                )
+
+            if day == 0:
+                images = images.replace('">', ' (onveranderd sinds 12:30)">', 1)
+
+            cells.append(
+                '<td><a id="%dp%d" href="javascript:k(%d,%d,-1);">%s</a></td>'
+                % (timestamp, index, timestamp, index, images)
+            )
+
+        rows.append("<tr>\n%s\n</tr>" % "\n".join(cells))
+
+        if day % 2 == 1:
+            rows.append('<tr><th colspan="%d"></th></tr>' % (residents + 2))
+
+    page = (
+        "<html>\n<head>\n<title>Eetlijst.nl - Synthetic</title>\n</head>\n"
+        "<body>\n<table><tr><td>\n<table>\n%s\n</table>\n</td><td>"
+        '<div class="scroll"><a title="Klik hier als je het prikbord wilt '
+        'aanpassen">Benchmark</a></div></td></tr></table>\n</body>\n</html>\n'
+    ) % "\n".join(rows)
+
+    return page.encode("utf-8")
+
+
+class CountingResponse(object):
+    """
+    Response of the `CountingTransport`.
+    """
+
+    __slots__ = ("status_code", "url", "content")
+
+    def __init__(self, status_code: int, url: str, content: bytes) -> None:
+        self.status_code = status_code
+        self.url = url
+        self.content = content
+
+
+class CountingTransport(eetlijst.Transport):
+    """
+    Transport that serves one page for every request, and counts the number of
+    requests per method.
+    """
+
+    __slots__ = ("content", "requests")
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        self.requests = {"GET": 0, "POST": 0}
+
+    def get(self, url, params=None, headers=None):
+        self.requests["GET"] += 1
+        return CountingResponse(
+            200, eetlijst.BASE_URL + "main.php?session_id=" + SESSION_ID, self.content
+        )
+
+    def post(self, url, data=None):
+        self.requests["POST"] += 1
+        return CountingResponse(
+            200, eetlijst.BASE_URL + "main.php?session_id=" + SESSION_ID, self.content
+        )
+
+
+def measure_time(func: Callable[[], Any], repeat: int) -> dict[str, float]:
+    """
+    Run `func` a number of times, and return timing statistics in seconds.
+    """
+
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "repeat": repeat,
+    }
+
+
+def measure_allocations(content: bytes) -> dict[str, float]:
+    """
+    Measure the memory retained by the result of parsing the status table, per
+    status row, and the peak memory used while parsing.
+    """
+
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        before = tracemalloc.take_snapshot()
+        rows = eetlijst.parse_statuses(content)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+
+    return {
+        "rows": len(rows),
+        "blocks_per_row": blocks / len(rows),
+        "bytes_per_row": size / len(rows),
+        "peak_bytes": peak,
+    }
+
+
+def measure_requests() -> dict[str, dict[str, int]]:
+    """
+    Count the number of HTTP requests per high-level operation.
+    """
+
+    content = generate_page(
+        start=datetime.now(tz=eetlijst.TZ_UTC).replace(microsecond=0)
+        + timedelta(hours=1)
+    )
+    timestamp = eetlijst.parse_statuses(content)[0].timestamp
+
+    def _dashboard(client):
+        client.get_name()
+        client.get_residents()
+        client.get_noticeboard()
+        client.get_statuses()
+
+    operations = {
+        "login": (False, lambda client: client._get_session()),
+        "get_statuses_cold": (False, lambda client: client.get_statuses()),
+        "get_statuses_warm": (True, lambda client: client.get_statuses()),
+        "dashboard_refresh": (True, _dashboard),
+        "set_noticeboard": (True, lambda client: client.set_noticeboard("Test")),
+        "set_status": (True, lambda client: client.set_status(0, -1, timestamp)),
+        "set_status_multi_step": (
+            True,
+            lambda client: client.set_status(0, -5, timestamp),
+        ),
+    }
+
+    result = {}
+
+    for name, (warm, operation) in operations.items():
+        transport = CountingTransport(content)
+        client = eetlijst.Eetlijst(
+            username="bench", password="bench", transport=transport
+        )
+
+        if warm:
+            client.get_statuses()
+            transport.requests = {"GET": 0, "POST": 0}
+
+        operation(client)
+        result[name] = dict(transport.requests)
+
+    return result
+
+
+def generate_history(
+    residents: int = 8, days: int = 3 * 365, seed: int = 0
+) -> eetlijst.StatusTable:
+    """
+    Generate a status history of the given number of residents and days. The
+    statuses are random, but deterministic for a given seed.
+    """
+
+    rng = random.Random(seed)
+    start = int(datetime(2014, 3, 28, 23, tzinfo=eetlijst.TZ_UTC).timestamp())
+    table = eetlijst.StatusTable(residents)
+
+    for day in range(days):
+        table.append(
+            start + day * 86400,
+            [rng.choice([None, 0, -1, -1, -1, -2, 1, 2]) for _ in range(residents)],
+        )
+
+    return table
+
+
+def measure_balance(
+    residents: int = 8, days: int = 3 * 365, repeat: int = 20
+) -> dict[str, Any]:
+    """
+    Compare computing the balance over a full history, with updating it
+    incrementally for one day that changed.
+    """
+
+    from .balance import Balance
+
+    table = generate_history(residents=residents, days=days)
+    names = ["Resident%d" % index for index in range(residents)]
+    last = table[-1].timestamp
+    values = [{names[0]: 1, names[1]: -1}, {names[0]: -1, names[1]: 1}]
+
+    balance = Balance()
+    balance.update(names, table)
+
+    def _full():
+        Balance().update(names, table)
+
+    def _incremental():
+        balance.set_day(last, values[0])
+        values.reverse()
+
+    return {
+        "days": days,
+        "residents": residents,
+        "full": measure_time(_full, max(1, repeat // 10)),
+        "incremental": measure_time(_incremental, repeat),
+    }
+
+
+def parse_import_times(output: str) -> dict[str, int]:
+    """
+    Parse the output of `python -X importtime`, and return the cumulative
+    import time in microseconds per module.
+    """
+
+    times = {}
+
+    for line in output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[12:].split("|")
+
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+
+    return times
+
+
+def measure_import(repeat: int = 5) -> dict[str, float]:
+    """
+    Measure the time to import the package in a new interpreter, in seconds.
+    """
+
+    timings = []
+
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import eetlijst"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        timings.append(parse_import_times(result.stderr)["eetlijst"] / 1e6)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "repeat": repeat,
+    }
+
+
+def measure_replay(
+    path: str,
+    clients: int = 4,
+    operations: int = 50,
+    latency: float = 0.05,
+    error_rate: float = 0.05,
+    session_lifetime: Optional[float] = 5.0,
+) -> dict[str, Any]:
+    """
+    Load test clients against a `ReplayServer` serving the cassette at `path`.
+    Each client retrieves the main page `operations` times, bypassing the
+    cache. Return the throughput and the counters of the server.
+    """
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    from .replay import Cassette, ReplayServer
+
+    server = ReplayServer(
+        Cassette.load(path),
+        latency=latency,
+        error_rate=error_rate,
+        session_lifetime=session_lifetime,
+    )
+
+    def _run(transport):
+        client = eetlijst.Eetlijst(
+            username="bench", password="bench", transport=transport
+        )
+
+        for _ in range(operations):
+            client.cache.delete("main_page")
+            client.get_statuses()
+
+    with server:
+        transports = [server.transport(backoff_factor=0) for _ in range(clients)]
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            list(executor.map(_run, transports))
+
+        duration = time.perf_counter() - start
+
+        for transport in transports:
+            transport.close()
+
+    return {
+        "clients": clients,
+        "operations": clients * operations,
+        "seconds": duration,
+        "operations_per_second": clients * operations / duration,
+        "server": dict(server.stats),
+    }
+
+
+def load_pages(directory: Optional[str]) -> dict[str, bytes]:
+    """
+    Load all main pages from a directory.
+    """
+
+    pages = {}
+
+    if directory:
+        for filename in sorted(glob.glob(os.path.join(directory, "*main*.html"))):
+            with open(filename, "rb") as fp:
+                pages[os.path.basename(filename)] = fp.read()
+
+    return pages
+
+
+def run(
+    pages_directory: Optional[str] = None,
+    sizes: Optional[list[tuple[int, int]]] = None,
+    repeat: int = 20,
+    history_days: int = 3 * 365,
+    cassette: Optional[str] = None,
+) -> dict[str, Any]:
+    """
+    Run all benchmarks, and return the results. The replay benchmark is only
+    run if a `cassette` is given.
+    """
+
+    pages = load_pages(pages_directory)
+
+    for residents, days in sizes or [(5, 7), (20, 60), (50, 60)]:
+        pages["synthetic_%dx%d" % (residents, days)] = generate_page(
+            residents=residents, days=days
+        )
+
+    parsers = [
+        parser for parser in eetlijst.PARSERS if eetlijst.get_parser(parser) == parser
+    ]
+
+    results = {
+        "version": eetlijst.__version__,
+        "python": platform.python_version(),
+        "timestamp": datetime.now(tz=eetlijst.TZ_UTC).isoformat(),
+        "pages": {},
+        "import": measure_import(repeat=max(1, repeat // 4)),
+        "requests": measure_requests(),
+        "balance": measure_balance(days=history_days, repeat=repeat),
+    }
+
+    if cassette:
+        results["replay"] = measure_replay(cassette)
+
+    for name, content in pages.items():
+        results["pages"][name] = {
+            "size": len(content),
+            "statuses": measure_time(lambda: eetlijst.parse_statuses(content), repeat),
+            "main_page": {
+                parser: measure_time(
+                    lambda: eetlijst.parse_main_page(content, parser=parser), repeat
+                )
+                for parser in parsers
+            },
+            "allocations": measure_allocations(content),
+        }
+
+    return results
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m eetlijst.bench", description=__doc__.strip().split("\n")[0]
+    )
+    parser.add_argument("--pages", help="directory with recorded main pages")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per benchmark")
+    parser.add_argument("--cassette", help="load test against a recorded cassette")
+    parser.add_argument("--output", help="write results to file instead of stdout")
+    args = parser.parse_args(argv[1:])
+
+    results = run(
+        pages_directory=args.pages, repeat=args.repeat, cassette=args.cassette
+    )
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(results, fp, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,916 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import hashlib
+import itertools
+import threading
+import time
+import urllib.parse as urlparse
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional, Union
+
+import eetlijst
+
+from .exceptions import Error, LoginError, ScrapingError, SessionError
+from .metrics import Metrics
+from .models import MainPageSnapshot, StatusRow, StatusUpdate, now, timeout
+from .parsing import get_parser, iter_statuses, parse_main_page
+from .store import MemoryStore, Store
+from .transport import RequestsTransport, Transport
+
+BASE_URL = "https://www.eetlijst.nl/"
+
+
+def _check_timestamp(timestamp: datetime) -> None:
+    if timestamp.tzinfo is None:
+        raise ValueError("Timestamp is time zone unaware.")
+
+    if timestamp < now():
+        raise ValueError("Timestamp cannot be in the past.")
+
+
+def _check_limit(limit: Optional[int]) -> Optional[int]:
+    # No limit (or a limit of zero) returns all rows, like the original
+    # scraper did.
+    if limit is not None and limit < 0:
+        raise ValueError("Limit cannot be negative.")
+
+    return limit or None
+
+
+def _status_steps(value: Optional[int]) -> list[int]:
+    # Pick strategy for advancing to value. Values other than -5, -4 and 4
+    # can be set without a problem, but the rest may require multiple
+    # steps.
+    if value == -5:
+        return [-3, -4, -4]
+    elif value == -4:
+        return [-3, -4]
+    elif value == 4:
+        return [3, 4]
+    elif value is None:
+        return [-5]  # None corresponds to -5.
+    else:
+        return [value]
+
+
+def _status_data(resident_index: int, timestamps: list[datetime], what: int) -> dict:
+    return {
+        "day[]": [int(timestamp.timestamp()) for timestamp in timestamps],
+        "submittype": 0,
+        "submitwithform.x": 20,
+        "submitwithform.y": 20,
+        "what": what,
+        "who": resident_index,
+    }
+
+
+def _plan_status_updates(
+    updates: list[StatusUpdate], snapshot: MainPageSnapshot
+) -> list[tuple[int, list[int], list[StatusUpdate]]]:
+    # Updates that are already at their target value are skipped. The others
+    # are grouped per resident and steps, because Eetlijst.nl accepts multiple
+    # days per request.
+    groups = {}
+
+    for update in updates:
+        row = snapshot.statuses.find(update.timestamp)
+
+        if row is not None and 0 <= update.resident_index < snapshot.statuses.residents:
+            if snapshot.statuses.get_value(row, update.resident_index) == update.value:
+                update.skipped = True
+                continue
+
+        key = (update.resident_index, tuple(_status_steps(update.value)))
+        groups.setdefault(key, []).append(update)
+
+    return [
+        (resident_index, list(steps), group)
+        for (resident_index, steps), group in groups.items()
+    ]
+
+
+def _noticeboard_data(message: str) -> dict:
+    return {
+        "Aanpassen.x": 20,
+        "Aanpassen.y": 20,
+        "messageboard": message,
+    }
+
+
+def _post_payload(session_id: str, data: dict[str, Union[str, int]]) -> dict:
+    payload = {
+        "day[]": "",
+        "messageboard": "",
+        "nieuwetijd": "",
+        "session_id": session_id,
+        "submittype": 2,
+        "veranderdag": "",
+        "what": -1,
+        "who": -1,
+    }
+    payload.update(data)
+
+    return payload
+
+
+def _session_from_login(status_code: int, url: str) -> str:
+    # Check for errors.
+    if status_code != 200:
+        raise SessionError("Unexpected status code: %d" % status_code)
+
+    if "r=failed" in url:
+        raise LoginError("Unable to login. Username and/or password incorrect.")
+
+    # Get session parameter.
+    query_string = urlparse.urlparse(url).query
+    query_array = urlparse.parse_qs(query_string)
+
+    try:
+        return query_array.get("session_id")[0]
+    except (IndexError, TypeError):
+        raise ScrapingError("Unable to strip session identifier from URL.")
+
+
+def _is_session_expired(status_code: int, url: str) -> bool:
+    # Check for errors.
+    if status_code != 200:
+        raise SessionError("Unexpected status code: %d" % status_code)
+
+    return "login.php" in url
+
+
+class Eetlijst(object):
+    """
+    Eetlijst base class.
+    """
+
+    __slots__ = (
+        "username",
+        "password",
+        "cache",
+        "transport",
+        "owns_transport",
+        "parser",
+        "lock",
+        "session_lock",
+        "flights",
+        "max_stale",
+        "previous",
+        "metrics",
+        "write_through",
+    )
+
+    def __init__(
+        self,
+        username: str = None,
+        password: str = None,
+        session_id: str = None,
+        login: bool = False,
+        transport: Optional[Transport] = None,
+        parser: Optional[str] = None,
+        max_stale: Optional[float] = None,
+        store: Optional[Store] = None,
+        metrics: Optional[Metrics] = None,
+        write_through: bool = False,
+    ) -> None:
+        """
+        Construct a new Eetlijst client. By default, login is deferred until
+        the first action is executed.
+
+        A username and password should be given to construct a session. Setting
+        `login` to `True` will directly login and get a session id.
+        Additionally, a `session_id` can be set to an identifier that is known
+        to be valid. Having `login` set to `True` in this case will test the
+        session identifier.
+
+        All requests are performed by `transport`. If none is given, a
+        `RequestsTransport` with connection pooling and keep-alive is created.
+        A transport can be shared between clients.
+
+        The `parser` selects the HTML parser backend: "html.parser", "lxml",
+        "html5lib" or "fast". If not given, the module-level `PARSER` is used.
+
+        Setting `max_stale` (in seconds) enables stale-while-revalidate: once
+        the cached page has expired, it is served for at most `max_stale`
+        seconds longer, while a fresh copy is retrieved in the background.
+
+        The session and cached page are kept in `store`, which defaults to a
+        `MemoryStore`. Use a `FileStore` or `SQLiteStore` to share them between
+        processes, such as subsequent runs of a script. Entries are namespaced
+        per account, so a store can be shared by multiple clients.
+
+        Pass `metrics` to record request durations, response sizes, cache hits
+        and misses, logins, retries and parse durations (see
+        `eetlijst.metrics`).
+
+        In `write_through` mode, successful writes are applied to the parsed
+        page in the cache, instead of parsing the page returned by the write.
+        These changes are checked against that page by `verify`, and replaced
+        when the page is retrieved again.
+
+        A client can be shared between threads. Session renewal happens once,
+        and concurrent requests for the same page are coalesced into one.
+
+        One big fat warning: this API is prone to race conditions. For
+        instance, reading data, wait a few seconds and writing it back may go
+        wrong if data has changed via other requests in the mean time.
+        Unfortunately, there is not much that you can do about it.
+        """
+
+        if username is None and password is None and session_id is None:
+            raise LoginError("No username/password or session identifier provided.")
+
+        self.username = username
+        self.password = password
+
+        self.cache = (store or MemoryStore()).namespace(
+            _store_namespace(username, session_id)
+        )
+
+        self.lock = threading.RLock()
+        self.session_lock = threading.RLock()
+        self.flights = {}
+
+        self.transport = transport or RequestsTransport()
+        self.owns_transport = transport is None
+
+        self.parser = get_parser(parser) if parser else None
+        self.max_stale = max_stale
+
+        # Last parsed snapshot, to skip parsing of unchanged statuses.
+        self.previous = None
+
+        self.metrics = metrics or Metrics()
+        self.write_through = write_through
+
+        # Store given session identifier.
+        if session_id:
+            self.session = (session_id, timeout(seconds=eetlijst.TIMEOUT_SESSION))
+
+            if login:
+                self._main_page()
+        else:
+            # Login if applicable.
+            if login:
+                self._get_session()
+
+    def clear_cache(self) -> None:
+        """
+        Clear the internal cache and reset session.
+        """
+
+        with self.lock:
+            self.cache.clear()
+
+    @property
+    def session(self) -> Optional[tuple[str, datetime]]:
+        """
+        Tuple of the session identifier and the time it is valid until, or
+        `None` if there is no session.
+        """
+
+        return self.cache.get("session")
+
+    @session.setter
+    def session(self, value: Optional[tuple[str, datetime]]) -> None:
+        if value is None:
+            self.cache.delete("session")
+        else:
+            self.cache["session"] = value
+
+    def close(self) -> None:
+        """
+        Close the transport, if it was created by this client.
+        """
+
+        if self.owns_transport:
+            self.transport.close()
+
+    def __enter__(self) -> "Eetlijst":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def get_session_id(self) -> str:
+        """
+        Return the current session identifier. If not session identifier is
+        not available, then `None` will be returned.
+        """
+
+        return self._get_session(renew=False)
+
+    def get_snapshot(self) -> MainPageSnapshot:
+        """
+        Return the parsed main page. Compare two snapshots with `diff` to find
+        the statuses that changed in between.
+        """
+
+        return self._get_snapshot()
+
+    def get_name(self) -> str:
+        """
+        Get the name of the Eetlijst list.
+        """
+
+        return self._get_snapshot("get_name").name
+
+    def get_residents(self) -> list[str]:
+        """
+        Return all users listed on the Eetlijst list. It does not account for
+        users that have been deleted.
+        """
+
+        return list(self._get_snapshot("get_residents").residents)
+
+    def get_noticeboard(self) -> str:
+        """
+        Return the contents of the noticeboard. It removes any formatting
+        and/or links.
+        """
+
+        return self._get_snapshot("get_noticeboard").noticeboard
+
+    def set_noticeboard(self, message: str) -> None:
+        """
+        Update the contents of the noticeboard.
+        """
+
+        snapshot = self._peek_snapshot() if self.write_through else None
+
+        self._main_page(post=True, data=_noticeboard_data(message))
+
+        if snapshot is not None:
+            self._write_through(snapshot.patch(noticeboard=message))
+
+    def set_status(self, resident_index, value, timestamp) -> bool:
+        """
+        Set the status for a given resident_index and timestamp in the future.
+        The timestamp should point to an extact row in the Eetlijst list.
+
+        Return True if the page returned after the change shows the new value.
+        In write-through mode, True is returned without parsing that page, if
+        the change could be applied to the cached page (see `verify`).
+        """
+
+        _check_timestamp(timestamp)
+
+        snapshot = self._peek_snapshot() if self.write_through else None
+
+        for what in _status_steps(value):
+            self._main_page(
+                post=True, data=_status_data(resident_index, [timestamp], what)
+            )
+
+        if snapshot is not None:
+            if self._write_through(
+                snapshot.patch(statuses=[(timestamp, resident_index, value)])
+            ):
+                return True
+
+        # Verify the change using the page returned by the last request.
+        try:
+            snapshot = self._get_snapshot("set_status")
+
+            return snapshot.get_value(timestamp, resident_index) == value
+        except (KeyError, IndexError):
+            return False
+
+    def set_statuses(
+        self, changes: Iterable[tuple[int, datetime, Optional[int]]]
+    ) -> list[StatusUpdate]:
+        """
+        Set the status for many residents and days at once. Each change is a
+        tuple of (resident_index, timestamp, value), where the timestamp should
+        point to an exact row in the Eetlijst list.
+
+        Changes to a value that is already set (according to the cached list)
+        are skipped. The remaining changes are grouped per resident and value,
+        and submitted for multiple days at once, so that the minimal number of
+        requests is performed. A StatusUpdate is returned for each change, in
+        the same order.
+        """
+
+        updates = [StatusUpdate(*change) for change in changes]
+
+        for update in updates:
+            _check_timestamp(update.timestamp)
+
+        snapshot = self._get_snapshot("set_statuses")
+        submitted = []
+
+        for resident_index, steps, group in _plan_status_updates(updates, snapshot):
+            timestamps = [update.timestamp for update in group]
+
+            try:
+                for what in steps:
+                    self._main_page(
+                        post=True,
+                        data=_status_data(resident_index, timestamps, what),
+                    )
+            except Error as e:
+                for update in group:
+                    update.error = e
+            else:
+                submitted.extend(group)
+
+        # Partially applied changes cannot be written through.
+        if self.write_through and submitted and all(u.error is None for u in updates):
+            self._write_through(
+                snapshot.patch(
+                    statuses=[
+                        (update.timestamp, update.resident_index, update.value)
+                        for update in submitted
+                    ]
+                )
+            )
+
+        return updates
+
+    def verify(self) -> bool:
+        """
+        Check the changes applied in write-through mode against the page
+        returned by the last write, and use that page from now on. Return True
+        if they are equal, or if there were no unverified changes.
+        """
+
+        with self.lock:
+            entry = self.cache.get("main_page")
+
+        if not entry or entry[2] is None or entry[2].verified:
+            return True
+
+        snapshot = parse_main_page(entry[0], parser=self.parser)
+
+        with self.lock:
+            current = self.cache.get("main_page")
+
+            if current and current[0] == entry[0]:
+                self.cache["main_page"] = (entry[0], current[1], snapshot)
+
+        return (
+            entry[2].noticeboard == snapshot.noticeboard
+            and not entry[2].diff(snapshot)
+            and len(entry[2].statuses) == len(snapshot.statuses)
+        )
+
+    def get_status(self, resident_index: int, timestamp: datetime) -> Optional[int]:
+        """
+        Return the status for a given date in the future. The timestamp should
+        point to an extact row in the Eetlijst list.
+        """
+
+        _check_timestamp(timestamp)
+
+        try:
+            return self._get_snapshot("get_status").get_value(timestamp, resident_index)
+        except KeyError:
+            raise ValueError("Timestamp does not point to a row.")
+
+    def get_statuses(self, limit: Optional[int] = None) -> list[StatusRow]:
+        """
+        Return the diner status of the residents for one or multiple days,
+        starting today. The result is a list of StatusRows, where each row
+        represents the Eetlijst list. All rows are returned if `limit` is None
+        or zero.
+        """
+
+        limit = _check_limit(limit)
+
+        # Parse only the rows needed, unless the page is parsed already.
+        if limit is not None:
+            snapshot, content = self._get_parsed_snapshot()
+
+            if snapshot is None:
+                return list(itertools.islice(iter_statuses(content), limit))
+
+        return self._get_snapshot("get_statuses").statuses[:limit]
+
+    def iter_statuses(self) -> Iterator[StatusRow]:
+        """
+        Return an iterator over the StatusRows, starting today. If the page was
+        not parsed before, rows are parsed while iterating, and parsing stops
+        when iteration stops.
+        """
+
+        snapshot, content = self._get_parsed_snapshot()
+
+        if snapshot is not None:
+            return iter(snapshot.statuses)
+
+        return iter_statuses(content)
+
+    def changed_since(self, last_changed: datetime) -> bool:
+        """
+        Return True if a status of today changed after the given time,
+        according to the last changed times listed by Eetlijst.nl. These times
+        have a resolution of one minute.
+        """
+
+        return self._get_snapshot("changed_since").statuses.changed_since(last_changed)
+
+    def _get_parsed_snapshot(self) -> tuple[Optional[MainPageSnapshot], bytes]:
+        # Return the main page, and its snapshot if it is parsed already.
+        content = self._main_page()
+
+        with self.lock:
+            entry = self.cache.get("main_page")
+
+            # Compare by value, since persistent stores return copies.
+            if entry and entry[0] == content and entry[2] is not None:
+                return entry[2], content
+
+        return None, content
+
+    def _peek_snapshot(self) -> Optional[MainPageSnapshot]:
+        # Return the parsed page from cache, without retrieving it.
+        with self.lock:
+            entry = self._from_cache("main_page")
+
+            return entry[2] if entry else None
+
+    def _write_through(self, snapshot: Optional[MainPageSnapshot]) -> bool:
+        # Store the snapshot with the changes of a write next to the page that
+        # was returned by the write.
+        if snapshot is None:
+            return False
+
+        with self.lock:
+            entry = self.cache.get("main_page")
+
+            if not entry:
+                return False
+
+            self.cache["main_page"] = (entry[0], entry[1], snapshot)
+
+        return True
+
+    def _get_snapshot(self, getter: str = "get_snapshot") -> MainPageSnapshot:
+        snapshot, content = self._get_parsed_snapshot()
+
+        if snapshot is not None:
+            return snapshot
+
+        # Parse the page only once, and store the result next to the page.
+        start = time.perf_counter()
+        snapshot = parse_main_page(content, parser=self.parser, previous=self.previous)
+        self.metrics.observe(
+            "parse_seconds", time.perf_counter() - start, getter=getter
+        )
+
+        with self.lock:
+            self.previous = snapshot
+            entry = self.cache.get("main_page")
+
+            if entry and entry[0] == content:
+                self.cache["main_page"] = (content, entry[1], snapshot)
+
+        return snapshot
+
+    def _from_cache(
+        self, key: str
+    ) -> Optional[tuple[bytes, datetime, Optional[MainPageSnapshot]]]:
+        try:
+            entry = self.cache[key]
+        except KeyError:
+            return None
+
+        return entry if now() < entry[1] else None
+
+    def _from_stale_cache(
+        self, key: str
+    ) -> Optional[tuple[bytes, datetime, Optional[MainPageSnapshot]]]:
+        if self.max_stale is None:
+            return None
+
+        try:
+            entry = self.cache[key]
+        except KeyError:
+            return None
+
+        return entry if now() < entry[1] + timedelta(seconds=self.max_stale) else None
+
+    def _login(self) -> tuple[str, datetime]:
+        # Verify username and password.
+        if self.username is None and self.password is None:
+            raise LoginError("Cannot login without username and password.")
+
+        # Create request
+        payload = {"login": self.username, "pass": self.password}
+        response = self._request("GET", BASE_URL + "login.php", params=payload)
+        session_id = _session_from_login(response.status_code, response.url)
+        self.metrics.increment("logins")
+
+        session = (session_id, timeout(seconds=eetlijst.TIMEOUT_SESSION))
+
+        with self.lock:
+            self.session = session
+
+            # Login redirects to main page, so cache it.
+            self.cache["main_page"] = (
+                response.content,
+                timeout(seconds=eetlijst.TIMEOUT_CACHE),
+                None,
+            )
+
+        return session
+
+    def _get_session(self, is_retry: bool = False, renew: bool = True) -> Optional[str]:
+        # Only one thread at a time may renew the session. Other threads wait,
+        # and use the renewed session afterwards.
+        with self.session_lock:
+            # The cache may be cleared by other threads at any time, so the
+            # session is read once.
+            session = self.session
+
+            # Start a session.
+            if session is None:
+                if not renew:
+                    return
+
+                session = self._login()
+
+            # Check if session is still valid.
+            session, valid_until = session
+
+            if valid_until < now():
+                if not renew:
+                    return
+
+                if is_retry:
+                    raise SessionError("Unable to renew session.")
+                else:
+                    self.metrics.increment("session_renewals")
+                    self.session = None
+                    return self._get_session(is_retry=True)
+
+            return session
+
+    def _main_page(
+        self,
+        is_retry: bool = False,
+        data: Optional[dict[str, Union[str, int]]] = None,
+        post: bool = False,
+    ) -> bytes:
+        if data is None:
+            data = {}
+
+        # Prepare request.
+        if post:
+            payload = _post_payload(self._get_session(), data)
+            response = self._request("POST", BASE_URL + "main.php", data=payload)
+
+            return self._handle_main_page(response, is_retry, data, post)
+
+        session_id = self._get_session()
+
+        # Serve from cache, or join a request that is already in flight, so
+        # that concurrent callers cause one request only.
+        with self.lock:
+            cached = self._from_cache("main_page")
+
+            # Keep the expiry of the page, so that it is retrieved again in
+            # time, however often it is used.
+            if cached:
+                self.metrics.increment("cache_hits")
+                self._extend_session()
+                return cached[0]
+
+            stale = self._from_stale_cache("main_page")
+
+            if stale:
+                self.metrics.increment("cache_stale_hits")
+            elif self.cache.get("main_page") is not None:
+                self.metrics.increment("cache_expired")
+            else:
+                self.metrics.increment("cache_misses")
+
+            flight = self.flights.get("main_page")
+            leader = flight is None
+
+            if leader:
+                flight = self.flights["main_page"] = _Flight()
+
+        # Serve a stale page right away, and refresh it in the background.
+        if stale:
+            if leader:
+                threading.Thread(
+                    target=self._revalidate_main_page,
+                    args=(flight, session_id, data),
+                    daemon=True,
+                ).start()
+
+            return stale[0]
+
+        if not leader:
+            return flight.wait()
+
+        return self._fetch_main_page(flight, session_id, data)
+
+    def _fetch_main_page(
+        self, flight: "_Flight", session_id: str, data: dict[str, Union[str, int]]
+    ) -> bytes:
+        try:
+            payload = {"session_id": session_id}
+            payload.update(data)
+
+            # Make the request conditional, if the previous response allows.
+            headers = self._get_validators()
+
+            if headers:
+                response = self._request(
+                    "GET", BASE_URL + "main.php", params=payload, headers=headers
+                )
+            else:
+                response = self._request("GET", BASE_URL + "main.php", params=payload)
+
+            flight.result = self._handle_main_page(response, False, data, False)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights["main_page"]
+
+            flight.event.set()
+
+        return flight.result
+
+    def _revalidate_main_page(
+        self, flight: "_Flight", session_id: str, data: dict[str, Union[str, int]]
+    ) -> None:
+        # Errors are recorded on the flight, for callers that joined it, and
+        # otherwise ignored. The next caller will try again.
+        try:
+            self._fetch_main_page(flight, session_id, data)
+        except Exception:
+            pass
+
+    def _handle_main_page(
+        self,
+        response,
+        is_retry: bool,
+        data: dict[str, Union[str, int]],
+        post: bool,
+    ) -> bytes:
+        # Not modified since the cached page was retrieved.
+        if response.status_code == 304 and not post:
+            with self.lock:
+                entry = self.cache.get("main_page")
+
+                if entry:
+                    self.metrics.increment("not_modified")
+                    self._update_main_page(entry[0], entry[2])
+                    return entry[0]
+
+            raise SessionError("Unexpected status code: 304")
+
+        # Session expired.
+        if _is_session_expired(response.status_code, response.url):
+            self.clear_cache()
+
+            # Determine to retry or not.
+            if is_retry:
+                raise SessionError("Unable to retrieve page: main.php")
+
+            self.metrics.increment("retries")
+
+            if post:
+                return self._main_page(is_retry=True, data=data, post=post)
+            else:
+                # Retry without joining the flight of this request. A login
+                # redirects to the main page, so it may be cached again.
+                payload = {"session_id": self._get_session()}
+                payload.update(data)
+
+                with self.lock:
+                    cached = self._from_cache("main_page")
+
+                    if cached:
+                        self._extend_session()
+                        return cached[0]
+
+                response = self._request("GET", BASE_URL + "main.php", params=payload)
+                return self._handle_main_page(response, True, data, post)
+
+        # Convert to string, we do not need the rest anymore.
+        content = response.content
+
+        with self.lock:
+            self._update_main_page(content, None)
+
+            if not post:
+                self._set_validators(response)
+
+        return content
+
+    def _request(self, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+
+        if method == "POST":
+            response = self.transport.post(url, **kwargs)
+        else:
+            response = self.transport.get(url, **kwargs)
+
+        self.metrics.observe(
+            "request_seconds", time.perf_counter() - start, method=method
+        )
+        self.metrics.observe(
+            "response_bytes", len(response.content or b""), method=method
+        )
+        self.metrics.increment(
+            "requests", method=method, status=str(response.status_code)
+        )
+
+        return response
+
+    def _get_validators(self) -> dict[str, str]:
+        validators = self.cache.get("validators")
+
+        if not validators or not self.cache.get("main_page"):
+            return {}
+
+        etag, last_modified = validators
+        headers = {}
+
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        return headers
+
+    def _set_validators(self, response) -> None:
+        # Cached pages are at least as recent as the response the validators
+        # belong to, so they do not have to be reset after a POST.
+        headers = getattr(response, "headers", None) or {}
+        validators = (headers.get("ETag"), headers.get("Last-Modified"))
+
+        if any(validators):
+            self.cache["validators"] = validators
+        elif self.cache.get("validators") is not None:
+            self.cache.delete("validators")
+
+    def _update_main_page(
+        self, content: bytes, snapshot: Optional[MainPageSnapshot]
+    ) -> None:
+        # Update cache and session. A parsed snapshot remains valid as long as
+        # the page itself did not change.
+        self._extend_session()
+
+        if snapshot is None:
+            entry = self.cache.get("main_page")
+
+            if entry and entry[2] is not None and entry[2].verified:
+                if entry[0] == content:
+                    snapshot = entry[2]
+
+        self.cache["main_page"] = (
+            content,
+            timeout(seconds=eetlijst.TIMEOUT_CACHE),
+            snapshot,
+        )
+
+    def _extend_session(self) -> None:
+        # Writes to a persistent store are costly, so the expiry is moved
+        # forward at most once per tenth of the session lifetime.
+        session = self.session
+
+        if session is None:
+            return
+
+        valid_until = timeout(seconds=eetlijst.TIMEOUT_SESSION)
+
+        if (valid_until - session[1]).total_seconds() >= eetlijst.TIMEOUT_SESSION / 10:
+            self.session = (session[0], valid_until)
+
+
+def _store_namespace(username: Optional[str], session_id: Optional[str]) -> str:
+    # Do not expose the username in file names or database keys.
+    account = "user:%s" % username if username is not None else "id:%s" % session_id
+
+    return hashlib.sha256(account.encode("utf-8")).hexdigest()[:16] + ":"
+
+
+class _Flight(object):
+    """
+    Represent a request in flight, that other threads can wait for.
+    """
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self) -> bytes:
+        self.event.wait()
+
+        if self.error is not None:
+            raise self.error
+
+        return self.result
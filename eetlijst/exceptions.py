@@ -0,0 +1,36 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+
+class Error(Exception):
+    """
+    Base Eetlijst error.
+    """
+
+    pass
+
+
+class LoginError(Error):
+    """
+    Error class for bad logins.
+    """
+
+    pass
+
+
+class SessionError(Error):
+    """
+    Error class for session and/or other errors.
+    """
+
+    pass
+
+
+class ScrapingError(Error):
+    """
+    Error class for scraping related errors.
+    """
+
+    pass
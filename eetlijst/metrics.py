@@ -0,0 +1,166 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import logging
+import threading
+from typing import Optional
+
+# Counters and observations recorded by the clients. Observations are in
+# seconds or bytes, as indicated by their name.
+COUNTERS = {
+    "requests": "HTTP requests performed",
+    "logins": "Logins performed",
+    "session_renewals": "Sessions renewed because they expired",
+    "retries": "Requests retried because the session expired",
+    "cache_hits": "Main pages served from cache",
+    "cache_stale_hits": "Main pages served from cache while revalidating",
+    "cache_misses": "Main pages not in cache",
+    "cache_expired": "Main pages in cache, but expired",
+    "not_modified": "Main pages revalidated by a conditional request",
+}
+
+OBSERVATIONS = {
+    "request_seconds": "Duration of HTTP requests",
+    "response_bytes": "Size of HTTP responses",
+    "parse_seconds": "Duration of parsing the main page",
+}
+
+# Histogram buckets per unit of observation. The buckets for seconds are the
+# defaults of prometheus_client. Pages of Eetlijst.nl are in the order of tens
+# of kilobytes.
+BUCKETS = {
+    "seconds": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    "bytes": (1e3, 1e4, 5e4, 1e5, 5e5, 1e6),
+}
+
+
+class Metrics(object):
+    """
+    Base class for instrumentation of a client. It ignores everything, so that
+    clients without metrics do not pay for them.
+
+    Subclass this and implement `increment` and `observe` to export the
+    numbers elsewhere. See `COUNTERS` and `OBSERVATIONS` for the names.
+    """
+
+    __slots__ = ()
+
+    def increment(self, name: str, amount: int = 1, **labels: str) -> None:
+        """
+        Increment a counter.
+        """
+
+        pass
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Record one observation, such as a duration or a size.
+        """
+
+        pass
+
+
+class MemoryMetrics(Metrics):
+    """
+    Metrics that are kept in memory, as totals per name (ignoring labels).
+    """
+
+    __slots__ = ("counters", "observations", "lock")
+
+    def __init__(self) -> None:
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.observations = {name: [] for name in OBSERVATIONS}
+        self.lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1, **labels: str) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        with self.lock:
+            self.observations.setdefault(name, []).append(value)
+
+
+class LoggingMetrics(Metrics):
+    """
+    Metrics that are written to a logger, one line per event.
+    """
+
+    __slots__ = ("logger", "level")
+
+    def __init__(
+        self, logger: Optional[logging.Logger] = None, level: int = logging.DEBUG
+    ) -> None:
+        self.logger = logger or logging.getLogger("eetlijst")
+        self.level = level
+
+    def increment(self, name: str, amount: int = 1, **labels: str) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s +%d %s", name, amount, _format(labels))
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s %.6g %s", name, value, _format(labels))
+
+
+class PrometheusMetrics(Metrics):
+    """
+    Metrics that are exported as Prometheus counters and histograms, with the
+    buckets of `BUCKETS` for the unit of each observation. Requires the
+    `prometheus_client` package.
+    """
+
+    __slots__ = ("registry", "namespace", "metrics", "lock")
+
+    def __init__(self, registry=None, namespace: str = "eetlijst") -> None:
+        try:
+            import prometheus_client
+        except ImportError:
+            raise ImportError("The prometheus_client package is required.")
+
+        self.registry = registry or prometheus_client.REGISTRY
+        self.namespace = namespace
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1, **labels: str) -> None:
+        self._get("Counter", name, COUNTERS, labels).inc(amount)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        unit = name.rsplit("_", 1)[-1]
+        metric = self._get(
+            "Histogram",
+            name,
+            OBSERVATIONS,
+            labels,
+            buckets=BUCKETS.get(unit, BUCKETS["seconds"]),
+        )
+
+        metric.observe(value)
+
+    def _get(
+        self, kind: str, name: str, descriptions: dict[str, str], labels, **kwargs
+    ):
+        import prometheus_client
+
+        # Metrics are created on first use, with the labels of that use.
+        with self.lock:
+            metric = self.metrics.get(name)
+
+            if metric is None:
+                metric = self.metrics[name] = getattr(prometheus_client, kind)(
+                    name,
+                    descriptions.get(name, name),
+                    labelnames=sorted(labels),
+                    namespace=self.namespace,
+                    registry=self.registry,
+                    **kwargs,
+                )
+
+        return metric.labels(**labels) if labels else metric
+
+
+def _format(labels: dict[str, str]) -> str:
+    return " ".join("%s=%s" % item for item in sorted(labels.items()))
@@ -0,0 +1,826 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+from array import array
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+import eetlijst
+
+from .exceptions import ScrapingError
+
+TZ_UTC = timezone.utc
+
+TIMEZONE_BACKENDS = ("pytz", "zoneinfo")
+
+# Time zones of Eetlijst.nl, per backend. They are loaded on first use.
+_TIMEZONES = {}
+
+
+def get_timezone(backend: Optional[str] = None) -> tzinfo:
+    """
+    Return the time zone of Eetlijst.nl (Europe/Amsterdam), using the given
+    backend. If `backend` is not given, `TIMEZONE_BACKEND` is used. The "pytz"
+    backend falls back to "zoneinfo" if pytz is not installed.
+    """
+
+    backend = backend or eetlijst.TIMEZONE_BACKEND
+
+    if backend not in TIMEZONE_BACKENDS:
+        raise ValueError("Unknown time zone backend: %s" % backend)
+
+    zone = _TIMEZONES.get(backend)
+
+    if zone is None:
+        if backend == "pytz":
+            try:
+                import pytz
+            except ImportError:
+                return get_timezone("zoneinfo")
+
+            zone = pytz.timezone("Europe/Amsterdam")
+        else:
+            import zoneinfo
+
+            zone = zoneinfo.ZoneInfo("Europe/Amsterdam")
+
+        _TIMEZONES[backend] = zone
+
+    return zone
+
+
+def now() -> datetime:
+    """
+    Return current datetime object with UTC timezone.
+    """
+    return datetime.now(tz=TZ_UTC)
+
+
+def timeout(seconds) -> datetime:
+    """
+    Helper to calculate datetime for now plus some seconds.
+    """
+    return now() + timedelta(seconds=seconds)
+
+
+class Status(object):
+    """
+    Represent one cell in a row of the dinner status table. A status is a
+    value, where:
+
+    None -> Nothing set
+     -N  -> Diner + N
+     -1  -> Diner
+      0  -> No dinner
+     +1  -> Cook
+     +N  -> Cook + N
+    """
+
+    __slots__ = ("value", "last_changed")
+
+    def __init__(self, value, last_changed) -> None:
+        self.value = value
+        self.last_changed = last_changed
+
+    def __repr__(self) -> str:
+        return "Status(value=%s, last_changed=%s)" % (self.value, self.last_changed)
+
+
+class StatusRow(object):
+    """
+    Represent one row of the dinner status table. A status row has a timestamp,
+    a deadline and a sequence of statuses (resident -> status).
+    """
+
+    __slots__ = ("timestamp", "deadline", "statuses")
+
+    def __init__(self, timestamp, deadline, statuses) -> None:
+        self.timestamp = timestamp
+        self.deadline = deadline
+        self.statuses = statuses
+
+    def __repr__(self) -> str:
+        return "StatusRow(timestamp=%s, deadline=%s, statuses=%s)" % (
+            self.timestamp,
+            self.deadline,
+            self.statuses,
+        )
+
+    def has_deadline_passed(self) -> bool:
+        """
+        Return True if the deadline has passed, False if not or if no deadline.
+        """
+
+        return self.deadline < now() if self.deadline else False
+
+    def time_left(self) -> timedelta:
+        """
+        Calculate the delta time between now and the deadline. May return a
+        negative number. In this case, the deadline has passed. If no deadline
+        is given, then midnight is taken.
+        """
+
+        timestamp = self.deadline or datetime(
+            year=self.timestamp.year,
+            month=self.timestamp.month,
+            day=self.timestamp.day,
+            hour=23,
+            minute=59,
+            second=59,
+        )
+
+        return timestamp - now()
+
+    def has_cook(self) -> bool:
+        """
+        Return True if there is at least one cook
+        """
+
+        return self._test(lambda x: x.value is not None and x.value > 0)
+
+    def has_diners(self) -> bool:
+        """
+        Return true if there is at least one diner (which isn't a cook)
+        """
+
+        return self._test(lambda x: x.value is not None and x.value < 0)
+
+    def get_cooks(self) -> list[int]:
+        """
+        Return a list of indices of all cooks
+        """
+
+        return self._extract(lambda x: x.value is not None and x.value > 0)
+
+    def get_diners(self) -> list[int]:
+        """
+        Return a list of indices of all diners (which are not cooks)
+        """
+
+        return self._extract(lambda x: x.value is not None and x.value < 0)
+
+    def get_diners_and_cooks(self) -> list[int]:
+        """
+        Return a list of indices of all diners and cooks.
+        """
+
+        return self.get_cooks() + self.get_diners()
+
+    def get_nones(self) -> list[int]:
+        """
+        Return a list of indices of ones not attending dinner.
+        """
+
+        return self._extract(lambda x: x.value == 0)
+
+    def get_unknowns(self) -> list[int]:
+        """
+        Return a list of indices of ones who haven't made choice yet
+        """
+
+        return self._extract(lambda x: x.value is None)
+
+    def get_nones_and_unknowns(self) -> list[int]:
+        """
+        Return a list of indices of ones not attending dinner and who haven't
+        made a choice yet.
+        """
+
+        return self.get_nones() + self.get_unknowns()
+
+    def get_count(self, indices=None) -> int:
+        """
+        Count the number of people attending dinner. This may include guests.
+
+        Optionally, a list of indices can be passed to limit the result.
+        """
+
+        count = 0
+
+        if indices is None:
+            statuses = self.statuses
+        else:
+            statuses = [self.statuses[index] for index in indices]
+
+        for status in statuses:
+            value = status.value
+
+            if value is not None:
+                if value < 0:
+                    count += -1 * value
+                elif value > 0:
+                    count += value
+
+        return count
+
+    def get_statuses(self, indices=None) -> list[int]:
+        """
+        Return the statuses.
+
+        Optionally, a list of indices can be passed to limit the result.
+        """
+
+        if indices is None:
+            return self.statuses
+        else:
+            return [self.statuses[index] for index in indices]
+
+    def _extract(self, test_func: Callable[[int], bool]) -> list[int]:
+        result = []
+
+        for index, status in enumerate(self.statuses):
+            if test_func(status):
+                result.append(index)
+
+        return result
+
+    def _test(self, test_func: Callable[[int], bool]) -> bool:
+        for status in self.statuses:
+            if test_func(status):
+                return True
+
+        return False
+
+
+class StatusTable(object):
+    """
+    Represent the dinner status table in a compact form. The values of all
+    rows are stored in one typed array of days x residents, next to an array
+    of row timestamps. It behaves like a list of StatusRows, but the StatusRow
+    and Status objects are only created when a row is accessed. Created rows
+    are kept and shared between accesses, so their statuses are a tuple.
+
+    Only the first row carries the time each status was last changed.
+    """
+
+    __slots__ = (
+        "residents",
+        "has_deadline",
+        "timestamps",
+        "values",
+        "last_changed",
+        "fingerprint",
+        "index",
+        "rows",
+    )
+
+    # Marker for a status that is not set, since arrays cannot hold None.
+    NONE = -32768
+
+    def __init__(self, residents: int = 0, has_deadline: bool = False) -> None:
+        self.residents = residents
+        self.has_deadline = has_deadline
+
+        self.timestamps = array("q")
+        self.values = array("h")
+        self.last_changed = array("q")
+
+        # Hash of the HTML of the table, if parsed from a page.
+        self.fingerprint = None
+
+        self.index = None
+        self.rows = None
+
+    def __repr__(self) -> str:
+        return "StatusTable(rows=%d, residents=%d, has_deadline=%s)" % (
+            len(self.timestamps),
+            self.residents,
+            self.has_deadline,
+        )
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __iter__(self) -> Iterator[StatusRow]:
+        for index in range(len(self.timestamps)):
+            yield self._get_row(index)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return [self._get_row(i) for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self.timestamps)
+
+        if not 0 <= index < len(self.timestamps):
+            raise IndexError("Row index out of range.")
+
+        return self._get_row(index)
+
+    def __getstate__(self) -> dict:
+        # Created rows are not stored, since they are cheap to create again.
+        return {name: getattr(self, name) for name in self.__slots__ if name != "rows"}
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            setattr(self, name, value)
+
+        self.rows = None
+
+    def append(
+        self,
+        timestamp: int,
+        values: list[Optional[int]],
+        last_changed: Optional[list[int]] = None,
+    ) -> None:
+        """
+        Append a row, given its timestamp (in seconds since the epoch) and the
+        values per resident. The last changed times (in seconds since the
+        epoch) are only stored for the first row.
+        """
+
+        if len(values) != self.residents:
+            raise ScrapingError("Unexpected number of statuses in row.")
+
+        if not self.timestamps and last_changed is not None:
+            self.last_changed.extend(last_changed)
+
+        self.timestamps.append(timestamp)
+        self.values.extend([self.NONE if value is None else value for value in values])
+        self.index = None
+        self.rows = None
+
+    def find(self, timestamp: datetime) -> Optional[int]:
+        """
+        Return the index of the row with the given timestamp, or None if there
+        is no such row. The index is built on first use.
+        """
+
+        if self.index is None:
+            self.index = {value: index for index, value in enumerate(self.timestamps)}
+
+        seconds = timestamp.timestamp()
+
+        return self.index.get(int(seconds)) if seconds.is_integer() else None
+
+    def get_last_changed(self) -> Optional[datetime]:
+        """
+        Return the time of the most recent change to a status of the first
+        row, or None if not known.
+        """
+
+        if not self.last_changed:
+            return None
+
+        return datetime.fromtimestamp(max(self.last_changed), tz=TZ_UTC)
+
+    def changed_since(self, last_changed: datetime) -> bool:
+        """
+        Return True if a status of the first row changed after the given time.
+        If the last changed times are not known, True is returned.
+        """
+
+        latest = self.get_last_changed()
+
+        return latest is None or latest > last_changed
+
+    def copy(self) -> "StatusTable":
+        """
+        Return a copy of this table, without a fingerprint.
+        """
+
+        table = StatusTable(self.residents, self.has_deadline)
+
+        table.timestamps = array("q", self.timestamps)
+        table.values = array("h", self.values)
+        table.last_changed = array("q", self.last_changed)
+        table.index = self.index
+
+        return table
+
+    def set_value(self, row: int, resident_index: int, value: Optional[int]) -> None:
+        """
+        Change the value of one status. If the row is the first row, then the
+        last changed time is updated as well.
+        """
+
+        if resident_index < 0:
+            resident_index += self.residents
+
+        if not 0 <= resident_index < self.residents:
+            raise IndexError("Resident index out of range.")
+
+        self.values[row * self.residents + resident_index] = (
+            self.NONE if value is None else value
+        )
+        self.fingerprint = None
+
+        if self.rows is not None:
+            self.rows[row] = None
+
+        # Eetlijst.nl lists the last changed times with minute resolution.
+        if row == 0 and self.last_changed:
+            self.last_changed[resident_index] = int(now().timestamp()) // 60 * 60
+
+    def get_value(self, row: int, resident_index: int) -> Optional[int]:
+        """
+        Return the value of one status, without creating a StatusRow.
+        """
+
+        if resident_index < 0:
+            resident_index += self.residents
+
+        if not 0 <= resident_index < self.residents:
+            raise IndexError("Resident index out of range.")
+
+        value = self.values[row * self.residents + resident_index]
+
+        return None if value == self.NONE else value
+
+    def diff(self, other: "StatusTable") -> list["StatusChange"]:
+        """
+        Compare this table with a newer one, and return the changed statuses.
+        Only days that are in both tables are compared, as well as residents
+        with an index that exists in both tables.
+
+        Tables parsed from identical HTML are not compared cell by cell.
+        """
+
+        if other is self or (
+            self.fingerprint is not None and self.fingerprint == other.fingerprint
+        ):
+            return []
+
+        if (
+            self.residents == other.residents
+            and self.timestamps == other.timestamps
+            and self.values == other.values
+        ):
+            return []
+
+        residents = min(self.residents, other.residents)
+        rows = {value: index for index, value in enumerate(other.timestamps)}
+        changes = []
+
+        for index, value in enumerate(self.timestamps):
+            other_index = rows.get(value)
+
+            if other_index is None:
+                continue
+
+            start = index * self.residents
+            end = start + residents
+            other_start = other_index * other.residents
+            other_end = other_start + residents
+            old = self.values[start:end]
+            new = other.values[other_start:other_end]
+
+            if old == new:
+                continue
+
+            timestamp = datetime.fromtimestamp(value, tz=TZ_UTC)
+
+            for resident_index, (old_value, new_value) in enumerate(zip(old, new)):
+                if old_value != new_value:
+                    changes.append(
+                        StatusChange(
+                            resident_index,
+                            timestamp,
+                            None if old_value == self.NONE else old_value,
+                            None if new_value == self.NONE else new_value,
+                        )
+                    )
+
+        return changes
+
+    def summarize(self) -> "StatusSummary":
+        """
+        Compute aggregates for all days and residents in one pass. NumPy is
+        used if it is installed and `USE_NUMPY` is enabled.
+        """
+
+        numpy = _get_numpy() if self.residents and len(self) else None
+
+        if numpy is not None:
+            return StatusSummary.from_numpy(numpy, self)
+
+        return StatusSummary.from_table(self)
+
+    def _get_row(self, index: int) -> StatusRow:
+        if self.rows is None:
+            self.rows = [None] * len(self.timestamps)
+
+        row = self.rows[index]
+
+        if row is None:
+            row = self.rows[index] = self._row(index)
+
+        return row
+
+    def _row(self, index: int) -> StatusRow:
+        timestamp = datetime.fromtimestamp(self.timestamps[index], tz=TZ_UTC)
+        start = index * self.residents
+        end = start + self.residents
+        values = self.values[start:end]
+
+        if index == 0 and self.last_changed:
+            last_changed = [
+                datetime.fromtimestamp(value, tz=TZ_UTC) for value in self.last_changed
+            ]
+        else:
+            last_changed = [None] * self.residents
+
+        return StatusRow(
+            timestamp=timestamp,
+            deadline=timestamp if self.has_deadline else None,
+            statuses=tuple(
+                Status(value=None if value == self.NONE else value, last_changed=when)
+                for value, when in zip(values, last_changed)
+            ),
+        )
+
+
+class StatusChange(object):
+    """
+    Represent one status that differs between two status tables.
+    """
+
+    __slots__ = ("resident_index", "timestamp", "old", "new")
+
+    def __init__(self, resident_index, timestamp, old, new) -> None:
+        self.resident_index = resident_index
+        self.timestamp = timestamp
+        self.old = old
+        self.new = new
+
+    def __repr__(self) -> str:
+        return "StatusChange(resident_index=%d, timestamp=%s, old=%s, new=%s)" % (
+            self.resident_index,
+            self.timestamp,
+            self.old,
+            self.new,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, StatusChange):
+            return NotImplemented
+
+        return (self.resident_index, self.timestamp, self.old, self.new) == (
+            other.resident_index,
+            other.timestamp,
+            other.old,
+            other.new,
+        )
+
+
+class StatusSummary(object):
+    """
+    Aggregates of a StatusTable. The attributes ending with `_per_day` hold
+    one number per row, and the attributes ending with `_per_resident` hold
+    one number per resident:
+
+    count -> Number of people attending dinner, including guests
+    cooks -> Number of cooks, or the number of days a resident cooked
+    diners -> Number of diners (which are not cooks), or the number of days a
+              resident joined dinner without cooking
+    guests -> Number of guests
+    absent -> Number of residents not attending dinner, or the number of days
+              a resident did not attend dinner
+    unknown -> Number of statuses that are not set
+    """
+
+    __slots__ = (
+        "count_per_day",
+        "cooks_per_day",
+        "diners_per_day",
+        "guests_per_day",
+        "absent_per_day",
+        "unknown_per_day",
+        "count_per_resident",
+        "cooks_per_resident",
+        "diners_per_resident",
+        "guests_per_resident",
+        "absent_per_resident",
+        "unknown_per_resident",
+    )
+
+    def __init__(self, days: int, residents: int) -> None:
+        for name in self.__slots__:
+            setattr(self, name, [0] * (days if name.endswith("_day") else residents))
+
+    def __repr__(self) -> str:
+        return "StatusSummary(%s)" % ", ".join(
+            "%s=%s" % (name, getattr(self, name)) for name in self.__slots__
+        )
+
+    @classmethod
+    def from_table(cls, table: StatusTable) -> "StatusSummary":
+        """
+        Compute the aggregates of a table in pure Python.
+        """
+
+        residents = table.residents
+        summary = cls(len(table), residents)
+
+        count_per_resident = summary.count_per_resident
+        cooks_per_resident = summary.cooks_per_resident
+        diners_per_resident = summary.diners_per_resident
+        guests_per_resident = summary.guests_per_resident
+        absent_per_resident = summary.absent_per_resident
+        unknown_per_resident = summary.unknown_per_resident
+
+        values = table.values
+
+        for day in range(len(table)):
+            start = day * residents
+            count = cooks = diners = guests = absent = unknown = 0
+
+            for resident_index in range(residents):
+                value = values[start + resident_index]
+
+                if value == StatusTable.NONE:
+                    unknown += 1
+                    unknown_per_resident[resident_index] += 1
+                elif value == 0:
+                    absent += 1
+                    absent_per_resident[resident_index] += 1
+                else:
+                    if value > 0:
+                        cooks += 1
+                        cooks_per_resident[resident_index] += 1
+                    else:
+                        value = -value
+                        diners += 1
+                        diners_per_resident[resident_index] += 1
+
+                    count += value
+                    guests += value - 1
+                    count_per_resident[resident_index] += value
+                    guests_per_resident[resident_index] += value - 1
+
+            summary.count_per_day[day] = count
+            summary.cooks_per_day[day] = cooks
+            summary.diners_per_day[day] = diners
+            summary.guests_per_day[day] = guests
+            summary.absent_per_day[day] = absent
+            summary.unknown_per_day[day] = unknown
+
+        return summary
+
+    @classmethod
+    def from_numpy(cls, numpy, table: StatusTable) -> "StatusSummary":
+        """
+        Compute the aggregates of a table using NumPy.
+        """
+
+        summary = cls(0, 0)
+
+        values = numpy.frombuffer(table.values, dtype=numpy.int16)
+        values = values.reshape(len(table), table.residents).astype(numpy.int32)
+
+        unknown = values == StatusTable.NONE
+        size = numpy.where(unknown, 0, numpy.abs(values))
+        masks = {
+            "count": size,
+            "cooks": values > 0,
+            "diners": (values < 0) & ~unknown,
+            "guests": numpy.maximum(size - 1, 0),
+            "absent": values == 0,
+            "unknown": unknown,
+        }
+
+        for name, mask in masks.items():
+            setattr(summary, name + "_per_day", mask.sum(axis=1).tolist())
+            setattr(summary, name + "_per_resident", mask.sum(axis=0).tolist())
+
+        return summary
+
+
+def _get_numpy():
+    if not eetlijst.USE_NUMPY:
+        return None
+
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+class StatusUpdate(object):
+    """
+    Represent the result of one change requested via `Eetlijst.set_statuses`.
+    A change is skipped if the resident already had the requested value. If
+    the change could not be submitted, `error` holds the exception.
+    """
+
+    __slots__ = ("resident_index", "timestamp", "value", "skipped", "error")
+
+    def __init__(self, resident_index, timestamp, value) -> None:
+        self.resident_index = resident_index
+        self.timestamp = timestamp
+        self.value = value
+        self.skipped = False
+        self.error = None
+
+    def __repr__(self) -> str:
+        return (
+            "StatusUpdate(resident_index=%d, timestamp=%s, value=%s, skipped=%s, "
+            "error=%r)"
+            % (
+                self.resident_index,
+                self.timestamp,
+                self.value,
+                self.skipped,
+                self.error,
+            )
+        )
+
+    def succeeded(self) -> bool:
+        """
+        Return True if the change was skipped or submitted without error.
+        """
+
+        return self.error is None
+
+
+class MainPageSnapshot(object):
+    """
+    Represent the parsed contents of the main page. A snapshot is built once
+    per fetched page, so all getters can share the result of a single parse.
+
+    A snapshot that is not `verified` was derived from another snapshot by
+    applying changes, instead of being parsed from a page.
+    """
+
+    __slots__ = ("name", "residents", "noticeboard", "statuses", "verified")
+
+    def __init__(self, name, residents, noticeboard, statuses) -> None:
+        self.name = name
+        self.residents = residents
+        self.noticeboard = noticeboard
+        self.statuses = statuses
+
+        self.verified = True
+
+    def __repr__(self) -> str:
+        return (
+            "MainPageSnapshot(name=%s, residents=%s, noticeboard=%s, statuses=%s)"
+            % (self.name, self.residents, self.noticeboard, self.statuses)
+        )
+
+    def get_row(self, timestamp: datetime) -> Optional[StatusRow]:
+        """
+        Return the status row for the given timestamp, or None if there is no
+        such row.
+        """
+
+        index = self.statuses.find(timestamp)
+
+        return None if index is None else self.statuses[index]
+
+    def patch(
+        self,
+        noticeboard: Optional[str] = None,
+        statuses: Iterable[tuple[datetime, int, Optional[int]]] = (),
+    ) -> Optional["MainPageSnapshot"]:
+        """
+        Return a copy of this snapshot with the given noticeboard and statuses
+        applied. The statuses are tuples of (timestamp, resident_index, value).
+        Return None if a timestamp does not point to a row, or a resident index
+        is out of range.
+        """
+
+        table = self.statuses.copy()
+
+        for timestamp, resident_index, value in statuses:
+            row = table.find(timestamp)
+
+            if row is None or not -table.residents <= resident_index < table.residents:
+                return None
+
+            table.set_value(row, resident_index, value)
+
+        snapshot = MainPageSnapshot(
+            name=self.name,
+            residents=self.residents,
+            noticeboard=self.noticeboard if noticeboard is None else noticeboard,
+            statuses=table,
+        )
+        snapshot.verified = False
+
+        return snapshot
+
+    def diff(self, other: "MainPageSnapshot") -> list[StatusChange]:
+        """
+        Compare the statuses with a newer snapshot, and return the changed
+        statuses (see `StatusTable.diff`).
+        """
+
+        return self.statuses.diff(other.statuses)
+
+    def get_value(self, timestamp: datetime, resident_index: int) -> Optional[int]:
+        """
+        Return the value of one status, without creating a StatusRow. Raises a
+        KeyError if there is no row for the given timestamp.
+        """
+
+        index = self.statuses.find(timestamp)
+
+        if index is None:
+            raise KeyError(timestamp)
+
+        return self.statuses.get_value(index, resident_index)
@@ -0,0 +1,676 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import functools
+import hashlib
+import html
+import importlib.util
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Iterator, Optional, Union
+
+import eetlijst
+
+from .exceptions import ScrapingError
+from .models import TZ_UTC, MainPageSnapshot, StatusRow, StatusTable, get_timezone
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
+PARSERS = ("html.parser", "lxml", "html5lib", "fast")
+
+RE_DIGIT = re.compile(r"\d+")
+RE_JAVASCRIPT_VS_1 = re.compile(r"javascript:vs")
+RE_JAVASCRIPT_VS_2 = re.compile(r"javascript:vs\(([0-9]*)\);")
+RE_JAVASCRIPT_K = re.compile(r"javascript:k\(([0-9]*),([-0-9]*),([-0-9]*)\);")
+RE_RESIDENTS = re.compile(r"Meer informatie over")
+RE_LAST_CHANGED = re.compile(r"onveranderd sinds ([0-9]+):([0-9]+)")
+RE_STATUS_TABLE = re.compile(r"<th\s[^>]*width=[\"']?80[\"'\s>]", re.IGNORECASE)
+RE_STATUS_TABLE_BYTES = re.compile(RE_STATUS_TABLE.pattern.encode(), re.IGNORECASE)
+RE_TABLE_TAG_BYTES = re.compile(rb"<(/?)table[\s>]", re.IGNORECASE)
+
+# Everything the status table parser needs from the raw page, in one pass:
+# tags that delimit rows and cells, JavaScript links, status images (by the
+# file name of their path), last changed markers and text.
+RE_STATUS_TOKENS = re.compile(
+    rb"<(/?)((?i:tr|td|th|table|script))(?=[\s>])"
+    rb"|(javascript:[^\"'\s>]*)"
+    rb"|[\"'=/](nop|kook|eet|leeg)\.gif(?=[\"'\s>])"
+    rb"|((?i:onveranderd sinds) [0-9]+:[0-9]+)"
+    rb"|>([^<>]+)"
+    rb"|(<!--)"
+)
+
+
+def get_parser(parser: Optional[str] = None) -> str:
+    """
+    Return the parser backend to use. If `parser` is not given, `PARSER` is
+    used. Backends that depend on a package that is not installed fall back to
+    "html.parser".
+    """
+
+    parser = parser or eetlijst.PARSER
+
+    if parser not in PARSERS:
+        raise ValueError("Unknown parser: %s" % parser)
+
+    if parser in ("lxml", "html5lib") and importlib.util.find_spec(parser) is None:
+        return "html.parser"
+
+    return parser
+
+
+def parse_main_page(
+    content: Union[bytes, str],
+    parser: Optional[str] = None,
+    previous: Optional[MainPageSnapshot] = None,
+) -> MainPageSnapshot:
+    """
+    Parse the contents of the main page into a snapshot, using the given parser
+    backend (see `get_parser`). The "fast" backend does not use BeautifulSoup
+    at all. The status table is always parsed by `parse_statuses`.
+
+    If a `previous` snapshot is given, and the HTML of the status table did
+    not change, then its status table is reused instead of parsed again.
+    """
+
+    parser = get_parser(parser)
+
+    if parser == "fast":
+        page = MainPageParser()
+
+        try:
+            page.feed(_decode(content))
+            page.close()
+        except _StopParsing:
+            pass
+
+        name = page.name.replace("Eetlijst.nl - ", "", 1).strip()
+        residents = page.residents
+        noticeboard = page.noticeboard
+    else:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(content, parser)
+
+        name = _parse_name(soup)
+        residents = _parse_residents(soup)
+        noticeboard = _parse_noticeboard(soup)
+
+    if previous is not None and previous.statuses.fingerprint is not None:
+        if previous.statuses.fingerprint == status_fingerprint(content):
+            statuses = previous.statuses
+        else:
+            statuses = parse_statuses(content)
+    else:
+        statuses = parse_statuses(content)
+
+    return MainPageSnapshot(
+        name=name,
+        residents=residents,
+        noticeboard=noticeboard,
+        statuses=statuses,
+    )
+
+
+def _parse_name(soup: "BeautifulSoup") -> str:
+    # Grap the list name.
+    return soup.find(["head", "title"]).text.replace("Eetlijst.nl - ", "", 1).strip()
+
+
+def _parse_residents(soup: "BeautifulSoup") -> list[str]:
+    # Find all names.
+    residents = soup.find_all(["th", "a"], title=RE_RESIDENTS)
+    return [x.nobr.b.text for x in residents]
+
+
+def _parse_noticeboard(soup: "BeautifulSoup") -> str:
+    # Grap the notice board. Links in the noticeboard are nested in the outer
+    # link, which some parsers repair into siblings. Therefore, use the text of
+    # the container.
+    return soup.find(
+        "a", title="Klik hier als je het prikbord wilt aanpassen"
+    ).parent.text
+
+
+class _StopParsing(Exception):
+    pass
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class StatusTableParser(HTMLParser):
+    """
+    Event-based parser for the dinner status table. It builds the status rows
+    in a single pass over the page, without building a document tree first.
+
+    The status table is the table that contains the header cell with a width
+    of 80 pixels. Parsing stops as soon as that table is closed.
+    """
+
+    IMAGES = {"nop.gif": 0, "kook.gif": 1, "eet.gif": 2, "leeg.gif": 3}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+
+        self.table = None
+
+        self._depth = 0
+        self._table_depth = None
+
+        self._row = None
+        self._cell = None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str]]) -> None:
+        if tag == "table":
+            self._depth += 1
+            return
+
+        if self._table_depth is None:
+            if tag == "th" and ("width", "80") in attrs:
+                self._table_depth = self._depth
+            return
+
+        if self._depth != self._table_depth:
+            return
+
+        if tag == "tr":
+            self._end_row()
+            self._row = [False, [], []]
+        elif self._row is None:
+            return
+        elif tag == "th":
+            self._row[0] = True
+        elif tag == "td":
+            self._end_cell()
+            self._cell = [0, 0, 0, 0, [], None]
+
+        # Inspect attributes for the row timestamp, the status images and the
+        # last changed marker.
+        for _, value in attrs:
+            if not value:
+                continue
+
+            if value.startswith("javascript:"):
+                self._row[1].append(value)
+            elif self._cell is not None:
+                # Images may be referred to by a path, e.g. "img/kook.gif".
+                image = self.IMAGES.get(value.rsplit("/", 1)[-1])
+
+                if image is not None:
+                    self._cell[image] += 1
+                elif self._cell[5] is None and self.table is None:
+                    self._cell[5] = RE_LAST_CHANGED.search(value.lower())
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "table":
+            if self._depth == self._table_depth:
+                self._end_row()
+                raise _StopParsing
+
+            self._depth -= 1
+        elif self._depth != self._table_depth:
+            return
+        elif tag == "tr":
+            self._end_row()
+        elif tag == "td":
+            self._end_cell()
+
+    def handle_data(self, data: str) -> None:
+        if self._cell is not None and self._depth == self._table_depth:
+            self._cell[4].append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._end_row()
+
+    def _end_cell(self) -> None:
+        if self._cell is not None:
+            self._row[2].append(self._cell)
+            self._cell = None
+
+    def _end_row(self) -> None:
+        self._end_cell()
+
+        row, self._row = self._row, None
+
+        # Skip header rows.
+        if row is None or row[0]:
+            return
+
+        self.table = _append_status_row(self.table, row[1], row[2])
+
+
+class MainPageParser(HTMLParser):
+    """
+    Event-based parser for the list name, residents and noticeboard of the
+    main page. It mirrors the BeautifulSoup-based scrapers, but does not build
+    a document tree. Parsing stops after the noticeboard.
+    """
+
+    VOID = {"area", "base", "br", "col", "hr", "img", "input", "link", "meta"}
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+
+        self.name = ""
+        self.residents = []
+        self.noticeboard = None
+
+        # Open elements, to find the container of the noticeboard.
+        self._stack = []
+        self._container = None
+
+        # None if idle, False if waiting for the <b> with the resident's name,
+        # or a list of strings when capturing the name.
+        self._resident = None
+        self._title = False
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str]]) -> None:
+        if tag == "title":
+            self._title = True
+        elif tag == "b" and self._resident is False:
+            self._resident = []
+        elif (tag == "th" or tag == "a") and self._container is None:
+            title = dict(attrs).get("title") or ""
+
+            if RE_RESIDENTS.search(title):
+                self._resident = False
+            elif tag == "a" and title == "Klik hier als je het prikbord wilt aanpassen":
+                self._container = len(self._stack)
+                self.noticeboard = ""
+
+        if tag not in self.VOID:
+            self._stack.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "title":
+            self._title = False
+        elif tag == "b" and isinstance(self._resident, list):
+            self.residents.append("".join(self._resident))
+            self._resident = None
+
+        # Close the most recent matching element, and any unclosed elements in
+        # between. Stop once the container of the noticeboard is closed.
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index] == tag:
+                del self._stack[index:]
+
+                if self._container is not None and index < self._container:
+                    raise _StopParsing
+
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._title:
+            self.name += data
+        elif isinstance(self._resident, list):
+            self._resident.append(data)
+        elif self._container is not None:
+            self.noticeboard += data
+
+
+def _append_status_row(
+    table: Optional[StatusTable], hrefs: list[str], cells: list[list]
+) -> StatusTable:
+    # Append a row to the table, or create the table for the first row. The
+    # cells are lists of the image counts (see `StatusTableParser.IMAGES`),
+    # the text and the last changed match.
+    first = table is None
+
+    # Check if the list uses deadlines.
+    if first:
+        has_deadline = any(RE_JAVASCRIPT_VS_1.search(href) for href in hrefs)
+    else:
+        has_deadline = table.has_deadline
+
+    timestamp, values, last_changed = _parse_status_row(
+        hrefs, cells, has_deadline, first
+    )
+
+    if first:
+        table = StatusTable(len(values), has_deadline)
+
+    table.append(timestamp, values, last_changed)
+
+    return table
+
+
+class _StatusTableScanner(object):
+    # Build the status table from the undecoded HTML of the page, with a single
+    # pass of RE_STATUS_TOKENS. This is equivalent to the StatusTableParser for
+    # the pages of Eetlijst.nl. Like that parser, the page can be scanned in
+    # chunks, and _StopParsing is raised once the table is closed. _Unsupported
+    # is raised for markup that cannot be handled this way (nested tables,
+    # scripts and comments), so the caller can fall back to the parser.
+
+    __slots__ = ("table", "depth", "row", "cell")
+
+    def __init__(self) -> None:
+        self.table = None
+        self.depth = 0
+
+        self.row = None
+        self.cell = None
+
+    def scan(self, content: bytes, start: int, end: int) -> None:
+        # Tokens do not contain a "<" other than at their start, so chunks
+        # should end right before one.
+        for match in RE_STATUS_TOKENS.finditer(content, start, end):
+            closing, tag, href, image, last_changed, text, comment = match.groups()
+
+            if tag is not None:
+                tag = tag.lower()
+
+                if tag == b"table":
+                    self.depth += -1 if closing else 1
+
+                    if self.depth > 1 or self.depth < 0:
+                        raise _Unsupported
+                    elif self.depth == 0:
+                        self.close()
+                        raise _StopParsing
+                elif tag == b"script":
+                    raise _Unsupported
+                elif tag == b"td" and closing:
+                    self._end_cell()
+                elif closing:
+                    if tag == b"tr":
+                        self._end_row()
+                elif tag == b"tr":
+                    self._end_row()
+                    self.row = [False, [], []]
+                elif self.row is None:
+                    continue
+                elif tag == b"th":
+                    self.row[0] = True
+                else:
+                    self._end_cell()
+                    self.cell = [0, 0, 0, 0, [], None]
+            elif comment is not None:
+                raise _Unsupported
+            elif self.row is None:
+                continue
+            elif href is not None:
+                self.row[1].append(href.decode("ascii", "replace"))
+            elif self.cell is None:
+                continue
+            elif image is not None:
+                self.cell[StatusTableParser.IMAGES[image.decode() + ".gif"]] += 1
+            elif text is not None:
+                text = text.decode("utf-8", "replace")
+                self.cell[4].append(html.unescape(text) if "&" in text else text)
+            elif self.cell[5] is None and self.table is None:
+                self.cell[5] = RE_LAST_CHANGED.search(last_changed.decode().lower())
+
+    def close(self) -> None:
+        self._end_row()
+
+    def _end_cell(self) -> None:
+        if self.cell is not None:
+            self.row[2].append(self.cell)
+            self.cell = None
+
+    def _end_row(self) -> None:
+        if self.row is None:
+            return
+
+        self._end_cell()
+
+        row, self.row = self.row, None
+
+        # Skip header rows.
+        if not row[0]:
+            self.table = _append_status_row(self.table, row[1], row[2])
+
+
+@functools.lru_cache(maxsize=64)
+def _local_midnight(timestamp: int) -> int:
+    # See `_parse_status_row`. The result is cached per day, since all pages
+    # retrieved on the same day start with the same row timestamp.
+    moment = datetime.fromtimestamp(timestamp, tz=TZ_UTC)
+
+    return int(
+        (
+            moment.replace(hour=0, minute=0, second=0, microsecond=0)
+            - moment.astimezone(get_timezone()).utcoffset()
+        ).timestamp()
+    )
+
+
+def _parse_status_row(
+    hrefs: list[str], cells: list[list], has_deadline: bool, first: bool
+) -> tuple[int, list[Optional[int]], Optional[list[int]]]:
+    if has_deadline:
+        start = 2
+        pattern = RE_JAVASCRIPT_VS_2
+    else:
+        start = 1
+        pattern = RE_JAVASCRIPT_K
+
+    # Match date and deadline.
+    for href in hrefs:
+        matches = pattern.search(href)
+
+        if matches:
+            break
+    else:
+        raise ScrapingError("Cannot parse row timestamp.")
+
+    timestamp = int(matches.group(1))
+
+    # Parse last changed. This only works for the first row. Note that
+    # Eetlijst.nl is a Dutch website and displays time in Europe/Amsterdam.
+    # Because time conversion is buggy, we take the UTC midnight, subtract the
+    # difference with Europe/Amsterdam for that day, and then add the hours and
+    # minutes to it. For some reason, converting Europe/Amsterdam back to UTC
+    # fails (see question at http://stackoverflow.com/a/5801263/1423623 for
+    # more info).
+    if first:
+        midnight = _local_midnight(timestamp)
+        last_changes = []
+    else:
+        last_changes = None
+
+    # Parse each cell for diner status.
+    values = []
+
+    for nop, kook, eet, leeg, text, last_changed in cells[start:]:
+        # Match numbers, in case there are more than 4 images.
+        extra = RE_DIGIT.search("".join(text))
+        extra = int(extra.group(0)) if extra else 1
+
+        if first:
+            if last_changed:
+                hour, minute = last_changed.groups()
+                last_changes.append(midnight + int(hour) * 3600 + int(minute) * 60)
+            else:
+                last_changes.append(midnight)
+
+        # Set the data.
+        if nop > 0:
+            value = 0
+        elif kook > 0 and eet == 0:
+            value = kook
+        elif kook > 0 and eet > 0:
+            value = kook + (eet * extra)
+        elif eet > 0:
+            value = -1 * (eet * extra)
+        elif leeg > 0:
+            value = None
+        else:
+            raise ScrapingError("Cannot parse diner status.")
+
+        values.append(value)
+
+    return timestamp, values, last_changes
+
+
+def _decode(content: Union[bytes, str]) -> str:
+    if isinstance(content, str):
+        return content
+
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("windows-1252", "replace")
+
+
+def parse_statuses(content: Union[bytes, str]) -> StatusTable:
+    """
+    Parse the dinner status table of the main page into a StatusTable, which
+    can be used as a list of StatusRows.
+
+    The table is extracted from the undecoded page with a single regular
+    expression pass. Markup that this cannot handle is parsed by the
+    `StatusTableParser` instead.
+    """
+
+    raw = content.encode("utf-8") if isinstance(content, str) else content
+    bounds = _status_table_bounds(raw)
+    table = None
+
+    if bounds is not None:
+        scanner = _StatusTableScanner()
+
+        try:
+            scanner.scan(raw, *bounds)
+            scanner.close()
+        except _StopParsing:
+            pass
+        except (_Unsupported, ScrapingError):
+            scanner = None
+
+        if scanner is not None:
+            table = scanner.table if scanner.table is not None else StatusTable()
+
+    if table is None:
+        table = _parse_status_table(content)
+
+    if bounds is not None:
+        table.fingerprint = _status_table_hash(raw, *bounds)
+
+    return table
+
+
+def _parse_status_table(content: Union[bytes, str]) -> StatusTable:
+    parser = StatusTableParser()
+
+    try:
+        parser.feed(_status_table_source(content))
+        parser.close()
+    except _StopParsing:
+        pass
+
+    if parser._table_depth is None:
+        raise ScrapingError("Cannot parse status table.")
+
+    return parser.table if parser.table is not None else StatusTable()
+
+
+def iter_statuses(
+    content: Union[bytes, str], chunk_size: int = 2048
+) -> Iterator[StatusRow]:
+    """
+    Parse the dinner status table of the main page row by row, in the same
+    way as `parse_statuses`. The page is scanned in chunks of about
+    `chunk_size` bytes, and scanning stops as soon as the caller stops
+    iterating. Retrieving the first rows is therefore cheaper than parsing the
+    whole table.
+    """
+
+    raw = content.encode("utf-8") if isinstance(content, str) else content
+    match = RE_STATUS_TABLE_BYTES.search(raw)
+    scanner = _StatusTableScanner()
+    count = 0
+
+    if match:
+        start = max(raw.rfind(b"<table", 0, match.start()), 0)
+
+        try:
+            while start < len(raw):
+                end = raw.find(b"<", start + chunk_size)
+
+                if end == -1:
+                    end = len(raw)
+
+                scanner.scan(raw, start, end)
+                start = end
+
+                # Rows are added to the table once they are complete.
+                while scanner.table is not None and count < len(scanner.table):
+                    yield scanner.table[count]
+                    count += 1
+
+            scanner.close()
+        except _StopParsing:
+            pass
+        except (_Unsupported, ScrapingError):
+            scanner = None
+    else:
+        scanner = None
+
+    # Parse the whole table otherwise, and continue after the rows that were
+    # returned already.
+    table = scanner.table if scanner is not None else _parse_status_table(content)
+
+    while table is not None and count < len(table):
+        yield table[count]
+        count += 1
+
+
+def _status_table_source(content: Union[bytes, str]) -> str:
+    content = _decode(content)
+
+    # Skip everything before the status table, if it can be located quickly.
+    match = RE_STATUS_TABLE.search(content)
+
+    if match:
+        start = max(content.rfind("<table", 0, match.start()), 0)
+        content = content[start:]
+
+    return content
+
+
+def status_fingerprint(content: Union[bytes, str]) -> Optional[bytes]:
+    """
+    Return a hash of the HTML of the status table, or None if the table cannot
+    be located. This is much cheaper than parsing the table, and can be used to
+    detect that the statuses did not change.
+    """
+
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    bounds = _status_table_bounds(content)
+
+    return _status_table_hash(content, *bounds) if bounds is not None else None
+
+
+def _status_table_bounds(content: bytes) -> Optional[tuple[int, int]]:
+    # Return the start and end of the HTML of the status table.
+    match = RE_STATUS_TABLE_BYTES.search(content)
+
+    if not match:
+        return None
+
+    start = max(content.rfind(b"<table", 0, match.start()), 0)
+    depth = 0
+
+    # Find the end of the table, taking nested tables into account.
+    for tag in RE_TABLE_TAG_BYTES.finditer(content, start):
+        depth += -1 if tag.group(1) else 1
+
+        if depth == 0:
+            return start, tag.end()
+
+    return None
+
+
+def _status_table_hash(content: bytes, start: int, end: int) -> bytes:
+    return hashlib.blake2b(content[start:end], digest_size=16).digest()
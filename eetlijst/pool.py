@@ -0,0 +1,258 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, Optional, Union
+
+from .client import Eetlijst
+from .metrics import Metrics
+from .models import StatusRow
+from .store import Store
+from .transport import RequestsTransport, Transport
+
+
+class RateLimiter(object):
+    """
+    Limit the number of calls to `rate` per second, by spacing them evenly.
+    """
+
+    __slots__ = ("interval", "next_time", "lock")
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until the next call is allowed.
+        """
+
+        with self.lock:
+            current = time.monotonic()
+            wait = self.next_time - current
+            self.next_time = max(current, self.next_time) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class LimitedTransport(Transport):
+    """
+    Transport that wraps another transport, and bounds the number of requests
+    in flight. A rate limiter can be given to bound the request rate as well.
+
+    Instances can share one semaphore, to bound the total number of requests
+    of many clients, while applying a rate limit per client.
+    """
+
+    __slots__ = ("transport", "semaphore", "rate_limiter")
+
+    def __init__(
+        self,
+        transport: Transport,
+        semaphore: threading.Semaphore,
+        rate_limiter: Optional[RateLimiter] = None,
+    ) -> None:
+        self.transport = transport
+        self.semaphore = semaphore
+        self.rate_limiter = rate_limiter
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> Any:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        with self.semaphore:
+            if headers:
+                return self.transport.get(url, params=params, headers=headers)
+
+            return self.transport.get(url, params=params)
+
+    def post(self, url: str, data: Optional[dict[str, Any]] = None) -> Any:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+        with self.semaphore:
+            return self.transport.post(url, data=data)
+
+
+class EetlijstPool(object):
+    """
+    Manage the clients of many Eetlijst accounts. All clients share one
+    transport (and thereby one connection pool), and bulk operations are
+    performed in parallel.
+    """
+
+    __slots__ = (
+        "clients",
+        "transport",
+        "owns_transport",
+        "semaphore",
+        "rate",
+        "max_workers",
+        "options",
+    )
+
+    def __init__(
+        self,
+        accounts: Optional[dict[str, dict[str, Any]]] = None,
+        transport: Optional[Transport] = None,
+        max_in_flight: int = 10,
+        rate: Optional[float] = None,
+        max_workers: Optional[int] = None,
+        parser: Optional[str] = None,
+        store: Optional[Store] = None,
+        max_stale: Optional[float] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        """
+        Construct a new pool. The `accounts` map a key to the keyword
+        arguments of an account (`username` and `password`, or `session_id`).
+
+        At most `max_in_flight` requests are performed at the same time, for
+        all accounts together. If `rate` is given, the requests of each
+        account are limited to `rate` requests per second. Bulk operations use
+        at most `max_workers` threads, which defaults to `max_in_flight`.
+
+        The `parser`, `store`, `max_stale` and `metrics` are passed to each
+        client.
+        """
+
+        self.clients = {}
+
+        self.transport = transport or RequestsTransport(pool_size=max_in_flight)
+        self.owns_transport = transport is None
+
+        self.semaphore = threading.BoundedSemaphore(max_in_flight)
+        self.rate = rate
+        self.max_workers = max_workers or max_in_flight
+
+        self.options = {
+            "parser": parser,
+            "store": store,
+            "max_stale": max_stale,
+            "metrics": metrics,
+        }
+
+        for key, account in (accounts or {}).items():
+            self.add(key, **account)
+
+    def add(
+        self,
+        key: str,
+        username: str = None,
+        password: str = None,
+        session_id: str = None,
+    ) -> Eetlijst:
+        """
+        Add an account to the pool, and return its client. Login is deferred
+        until the first action is executed.
+        """
+
+        if key in self.clients:
+            raise KeyError("Account already exists: %s" % key)
+
+        rate_limiter = RateLimiter(self.rate) if self.rate else None
+
+        self.clients[key] = client = Eetlijst(
+            username=username,
+            password=password,
+            session_id=session_id,
+            transport=LimitedTransport(self.transport, self.semaphore, rate_limiter),
+            **self.options,
+        )
+
+        return client
+
+    def remove(self, key: str) -> None:
+        """
+        Remove an account from the pool.
+        """
+
+        del self.clients[key]
+
+    def __getitem__(self, key: str) -> Eetlijst:
+        return self.clients[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.clients
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.clients)
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    def __enter__(self) -> "EetlijstPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the transport, if it was created by this pool.
+        """
+
+        if self.owns_transport:
+            self.transport.close()
+
+    def map(
+        self,
+        func: Callable[[Eetlijst], Any],
+        keys: Optional[list[str]] = None,
+        return_exceptions: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Call `func` with the client of each account in parallel, and return
+        the results keyed by account. If `return_exceptions` is `True`,
+        exceptions are returned as results instead of being raised.
+        """
+
+        keys = list(self.clients) if keys is None else keys
+
+        def _call(key):
+            try:
+                return func(self.clients[key])
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+
+                return e
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(_call, keys)
+
+            return dict(zip(keys, results))
+
+    def get_statuses_all(
+        self, limit: Optional[int] = None, return_exceptions: bool = False
+    ) -> dict[str, Union[list[StatusRow], Exception]]:
+        """
+        Return the statuses of all accounts, keyed by account.
+        """
+
+        return self.map(
+            lambda client: client.get_statuses(limit=limit),
+            return_exceptions=return_exceptions,
+        )
+
+    def get_names_all(
+        self, return_exceptions: bool = False
+    ) -> dict[str, Union[str, Exception]]:
+        """
+        Return the name of the list of all accounts, keyed by account.
+        """
+
+        return self.map(
+            lambda client: client.get_name(), return_exceptions=return_exceptions
+        )
@@ -0,0 +1,556 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+"""
+Record HTTP exchanges with Eetlijst.nl, and replay them without a network.
+
+A `RecordingTransport` wraps another transport and captures the responses of
+login.php and main.php into a `Cassette`, which can be saved as JSON. The
+`ReplayTransport` serves a cassette from memory, and the `ReplayServer` serves
+it over HTTP from a local server thread, with configurable latency, injected
+errors and session expiry. Use the latter to load test clients.
+
+Cassettes do not contain request parameters, nor query parameters of response
+URLs other than the session identifier (and thus no passwords), but they do
+contain the pages and session identifiers of the recorded account.
+"""
+
+import base64
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse as urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from .client import BASE_URL
+from .transport import RequestsTransport, Transport
+
+# Response headers that are recorded, since the client uses them.
+HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+# Query parameters of response URLs that are recorded. Others, such as the
+# credentials of a login that was not redirected, are dropped.
+PARAMETERS = ("session_id", "r")
+
+RE_SESSION_ID = re.compile(r"session_id=([^&]*)")
+
+
+class Exchange(object):
+    """
+    One recorded request and response. The `path` is the page requested (e.g.
+    "main.php"), and the `url` is the page and query string of the response,
+    after redirects.
+    """
+
+    __slots__ = ("method", "path", "status_code", "url", "headers", "content")
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        status_code: int,
+        url: str,
+        headers: dict[str, str],
+        content: bytes,
+    ) -> None:
+        self.method = method
+        self.path = path
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
+
+    def __repr__(self) -> str:
+        return "Exchange(method=%s, path=%s, status_code=%d, url=%s)" % (
+            self.method,
+            self.path,
+            self.status_code,
+            self.url,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Return the exchange as a JSON-serializable dictionary.
+        """
+
+        try:
+            content = {"content": self.content.decode("utf-8")}
+        except UnicodeDecodeError:
+            content = {"content_base64": base64.b64encode(self.content).decode()}
+
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "url": self.url,
+            "headers": self.headers,
+            **content,
+        }
+
+    @classmethod
+    def from_dict(cls, value: dict[str, Any]) -> "Exchange":
+        """
+        Construct an exchange from a dictionary created by `to_dict`.
+        """
+
+        if "content_base64" in value:
+            content = base64.b64decode(value["content_base64"])
+        else:
+            content = value["content"].encode("utf-8")
+
+        return cls(
+            method=value["method"],
+            path=value["path"],
+            status_code=value["status_code"],
+            url=value["url"],
+            headers=value.get("headers") or {},
+            content=content,
+        )
+
+
+class Cassette(object):
+    """
+    An ordered list of exchanges.
+    """
+
+    __slots__ = ("exchanges", "lock")
+
+    def __init__(self, exchanges: Optional[list[Exchange]] = None) -> None:
+        self.exchanges = list(exchanges or [])
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.exchanges)
+
+    def add(self, exchange: Exchange) -> None:
+        """
+        Append an exchange.
+        """
+
+        with self.lock:
+            self.exchanges.append(exchange)
+
+    def save(self, path: str) -> None:
+        """
+        Write the cassette to a JSON file.
+        """
+
+        with open(path, "w") as fp:
+            json.dump(
+                {"exchanges": [exchange.to_dict() for exchange in self.exchanges]},
+                fp,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """
+        Read a cassette from a JSON file.
+        """
+
+        with open(path, "r") as fp:
+            value = json.load(fp)
+
+        return cls([Exchange.from_dict(exchange) for exchange in value["exchanges"]])
+
+
+class ReplayResponse(object):
+    """
+    Response served by the `ReplayTransport`.
+    """
+
+    __slots__ = ("status_code", "url", "headers", "content")
+
+    def __init__(
+        self, status_code: int, url: str, headers: dict[str, str], content: bytes
+    ) -> None:
+        self.status_code = status_code
+        self.url = url
+        self.headers = headers
+        self.content = content
+
+
+class RecordingTransport(Transport):
+    """
+    Transport that wraps another transport, and records all exchanges into a
+    cassette.
+    """
+
+    __slots__ = ("transport", "cassette")
+
+    def __init__(self, transport: Transport, cassette: Optional[Cassette] = None):
+        self.transport = transport
+        self.cassette = cassette if cassette is not None else Cassette()
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> Any:
+        if headers:
+            response = self.transport.get(url, params=params, headers=headers)
+        else:
+            response = self.transport.get(url, params=params)
+
+        return self._record("GET", url, response)
+
+    def post(self, url: str, data: Optional[dict[str, Any]] = None) -> Any:
+        return self._record("POST", url, self.transport.post(url, data=data))
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def _record(self, method: str, url: str, response: Any) -> Any:
+        headers = getattr(response, "headers", None) or {}
+
+        self.cassette.add(
+            Exchange(
+                method=method,
+                path=_page(url),
+                status_code=response.status_code,
+                url=_relative(response.url),
+                headers={name: headers[name] for name in HEADERS if name in headers},
+                content=_encode(response.content),
+            )
+        )
+
+        return response
+
+
+class _Player(object):
+    # Select the exchanges to replay. Requests for a method and page are
+    # answered by the recorded exchanges for that method and page, in order.
+    # The last one is repeated once all have been used.
+
+    __slots__ = ("exchanges", "positions", "lock")
+
+    def __init__(self, cassette: Cassette) -> None:
+        self.exchanges = {}
+        self.positions = {}
+        self.lock = threading.Lock()
+
+        for exchange in cassette.exchanges:
+            self.exchanges.setdefault((exchange.method, exchange.path), []).append(
+                exchange
+            )
+
+    def next(self, method: str, path: str) -> Optional[Exchange]:
+        key = (method, path)
+        exchanges = self.exchanges.get(key)
+
+        if not exchanges:
+            return None
+
+        with self.lock:
+            position = self.positions.get(key, 0)
+            self.positions[key] = min(position + 1, len(exchanges) - 1)
+
+        return exchanges[position]
+
+
+class ReplayTransport(Transport):
+    """
+    Transport that serves the exchanges of a cassette from memory. A `latency`
+    in seconds can be added to every request.
+    """
+
+    __slots__ = ("player", "latency")
+
+    def __init__(self, cassette: Cassette, latency: float = 0.0) -> None:
+        self.player = _Player(cassette)
+        self.latency = latency
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> ReplayResponse:
+        return self._replay("GET", url)
+
+    def post(self, url: str, data: Optional[dict[str, Any]] = None) -> ReplayResponse:
+        return self._replay("POST", url)
+
+    def _replay(self, method: str, url: str) -> ReplayResponse:
+        if self.latency:
+            time.sleep(self.latency)
+
+        exchange = self.player.next(method, _page(url))
+
+        if exchange is None:
+            return ReplayResponse(404, url, {}, b"")
+
+        return ReplayResponse(
+            exchange.status_code,
+            BASE_URL + exchange.url,
+            exchange.headers,
+            exchange.content,
+        )
+
+
+class RebasedTransport(Transport):
+    """
+    Transport that wraps another transport, and sends requests for Eetlijst.nl
+    to another base URL.
+    """
+
+    __slots__ = ("transport", "base_url")
+
+    def __init__(self, transport: Transport, base_url: str) -> None:
+        self.transport = transport
+        self.base_url = base_url
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> Any:
+        if headers:
+            return self.transport.get(self._rebase(url), params=params, headers=headers)
+
+        return self.transport.get(self._rebase(url), params=params)
+
+    def post(self, url: str, data: Optional[dict[str, Any]] = None) -> Any:
+        return self.transport.post(self._rebase(url), data=data)
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def _rebase(self, url: str) -> str:
+        if url.startswith(BASE_URL):
+            end = len(BASE_URL)
+            return self.base_url + url[end:]
+
+        return url
+
+
+class ReplayServer(object):
+    """
+    Local HTTP server that serves the exchanges of a cassette, for load
+    testing clients without a network. Use `transport` to create a transport
+    that sends the requests of a client to this server.
+
+    Every request is delayed by `latency` seconds, and fails with status code
+    `error_status` with a probability of `error_rate`. If `session_lifetime`
+    is given, then each login issues a new session identifier, and requests
+    with a session older than `session_lifetime` seconds (or one that was not
+    issued by this server) are redirected to the login page, like Eetlijst.nl
+    does. Random choices are deterministic for a given `seed`.
+
+    The number of requests, errors, logins and expired sessions are counted in
+    `stats`.
+    """
+
+    __slots__ = (
+        "player",
+        "latency",
+        "error_rate",
+        "error_status",
+        "session_lifetime",
+        "random",
+        "sessions",
+        "redirects",
+        "stats",
+        "lock",
+        "server",
+        "thread",
+    )
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        session_lifetime: Optional[float] = None,
+        seed: int = 0,
+    ) -> None:
+        self.player = _Player(cassette)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.session_lifetime = session_lifetime
+        self.random = random.Random(seed)
+
+        # Issue time per session identifier, and responses to redirect to.
+        self.sessions = {}
+        self.redirects = {}
+
+        self.stats = {"requests": 0, "errors": 0, "logins": 0, "expired": 0}
+        self.lock = threading.Lock()
+
+        self.server = None
+        self.thread = None
+
+    def __enter__(self) -> "ReplayServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """
+        Base URL of the running server.
+        """
+
+        return "http://127.0.0.1:%d/" % self.server.server_port
+
+    def start(self) -> None:
+        """
+        Start serving from a background thread, on a free port.
+        """
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ReplayHandler)
+        self.server.daemon_threads = True
+        self.server.replay = self
+
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the server, and wait for its thread to finish.
+        """
+
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+
+            self.server = self.thread = None
+
+    def transport(self, **kwargs: Any) -> RebasedTransport:
+        """
+        Return a transport that sends requests to this server. The keyword
+        arguments are passed to the `RequestsTransport`.
+        """
+
+        return RebasedTransport(RequestsTransport(**kwargs), self.url)
+
+    def _respond(
+        self, method: str, path: str, query: str, body: str
+    ) -> tuple[int, dict[str, str], bytes]:
+        # Return the status code, headers and content of a response.
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.stats["requests"] += 1
+
+            if self.error_rate and self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return self.error_status, {}, b""
+
+            fields = urlparse.parse_qs(query)
+
+            # Second half of a redirect.
+            if "replay" in fields:
+                exchange = self.redirects.pop(fields["replay"][0], None)
+
+                if exchange is None:
+                    return 404, {}, b""
+
+                return exchange.status_code, exchange.headers, exchange.content
+
+            if path == "main.php" and self.session_lifetime is not None:
+                session_id = (fields or urlparse.parse_qs(body)).get("session_id")
+                issued = self.sessions.get(session_id[0] if session_id else None)
+
+                if issued is None or time.monotonic() - issued > self.session_lifetime:
+                    self.stats["expired"] += 1
+                    return self._redirect(
+                        Exchange(method, path, 200, "login.php", {}, b"<html></html>")
+                    )
+
+        exchange = self.player.next(method, path)
+
+        if exchange is None:
+            return 404, {}, b""
+
+        with self.lock:
+            if path == "login.php":
+                self.stats["logins"] += 1
+
+            if exchange.url.split("?", 1)[0] != path:
+                return self._redirect(exchange)
+
+        return exchange.status_code, exchange.headers, exchange.content
+
+    def _redirect(self, exchange: Exchange) -> tuple[int, dict[str, str], bytes]:
+        # Redirect to the page of the exchange. The token in the query string
+        # identifies the exchange to serve.
+        token = "%032x" % self.random.getrandbits(128)
+        url = exchange.url
+
+        if self.session_lifetime is not None and RE_SESSION_ID.search(url):
+            session_id = "%032x" % self.random.getrandbits(128)
+            self.sessions[session_id] = time.monotonic()
+            url = RE_SESSION_ID.sub("session_id=" + session_id, url)
+
+        self.redirects[token] = exchange
+        separator = "&" if "?" in url else "?"
+
+        return 302, {"Location": "/%s%sreplay=%s" % (url, separator, token)}, b""
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle("GET", "")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._handle("POST", self.rfile.read(length).decode("utf-8", "replace"))
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self, method: str, body: str) -> None:
+        parts = urlparse.urlsplit(self.path)
+        status_code, headers, content = self.server.replay._respond(
+            method, parts.path.lstrip("/"), parts.query, body
+        )
+
+        self.send_response(status_code)
+
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def _page(url: str) -> str:
+    return urlparse.urlsplit(url).path.rsplit("/", 1)[-1]
+
+
+def _relative(url: str) -> str:
+    parts = urlparse.urlsplit(url)
+    page = parts.path.rsplit("/", 1)[-1]
+    query = urlparse.urlencode(
+        [
+            (name, value)
+            for name, value in urlparse.parse_qsl(parts.query, keep_blank_values=True)
+            if name in PARAMETERS
+        ]
+    )
+
+    return page + "?" + query if query else page
+
+
+def _encode(content: Any) -> bytes:
+    if isinstance(content, str):
+        return content.encode("utf-8")
+
+    return content or b""
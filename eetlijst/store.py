@@ -0,0 +1,255 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import os
+import pickle
+import threading
+import urllib.parse as urlparse
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import sqlite3
+
+_MISSING = object()
+
+
+class Store(object):
+    """
+    Base class for storing the session and cache of a client. Expiry is not
+    handled by the store, since the client stores the expiry time along with
+    each value.
+
+    Persistent stores pickle their values, so only use them with files that
+    are not writable by others.
+    """
+
+    __slots__ = ()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Return the value of `key`, or `default` if it does not exist.
+        """
+
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Set the value of `key`.
+        """
+
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        """
+        Delete `key`, if it exists.
+        """
+
+        raise NotImplementedError
+
+    def clear(self, prefix: str = "") -> None:
+        """
+        Delete all keys that start with `prefix`.
+        """
+
+        raise NotImplementedError
+
+    def namespace(self, prefix: str) -> "NamespacedStore":
+        """
+        Return a view on this store, that prefixes all keys. This allows one
+        store to be shared by multiple clients.
+        """
+
+        return NamespacedStore(self, prefix)
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.set(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self.delete(key)
+
+
+class NamespacedStore(Store):
+    """
+    View on a store, that prefixes all keys.
+    """
+
+    __slots__ = ("store", "prefix")
+
+    def __init__(self, store: Store, prefix: str) -> None:
+        self.store = store
+        self.prefix = prefix
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.store.get(self.prefix + key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self.store.set(self.prefix + key, value)
+
+    def delete(self, key: str) -> None:
+        self.store.delete(self.prefix + key)
+
+    def clear(self, prefix: str = "") -> None:
+        self.store.clear(self.prefix + prefix)
+
+
+class MemoryStore(Store):
+    """
+    Store that keeps values in memory. This is the default.
+    """
+
+    __slots__ = ("values",)
+
+    def __init__(self) -> None:
+        self.values = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.values.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        self.values[key] = value
+
+    def delete(self, key: str) -> None:
+        self.values.pop(key, None)
+
+    def clear(self, prefix: str = "") -> None:
+        for key in [key for key in self.values if key.startswith(prefix)]:
+            del self.values[key]
+
+
+class FileStore(Store):
+    """
+    Store that keeps each value in a file in a directory. Writes go to a
+    temporary file first, which then replaces the old file atomically, so
+    concurrent readers in other processes never see a partial value.
+    """
+
+    __slots__ = ("directory",)
+
+    def __init__(self, directory: str) -> None:
+        self.directory = os.path.expanduser(directory)
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            with open(self._path(key), "rb") as fp:
+                return pickle.load(fp)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        import tempfile
+
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(path, self._path(key))
+        except BaseException:
+            os.unlink(path)
+            raise
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self, prefix: str = "") -> None:
+        prefix = self._filename(prefix)
+
+        for filename in os.listdir(self.directory):
+            if filename.startswith(prefix) and not filename.startswith(".tmp-"):
+                try:
+                    os.unlink(os.path.join(self.directory, filename))
+                except FileNotFoundError:
+                    pass
+
+    def _filename(self, key: str) -> str:
+        # Quoting maps each character independently, so prefixes are kept.
+        return urlparse.quote(key, safe="")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, self._filename(key))
+
+
+class SQLiteStore(Store):
+    """
+    Store that keeps values in a SQLite database. SQLite serializes concurrent
+    writes from multiple processes. Connections are not shared between
+    threads.
+    """
+
+    __slots__ = ("path", "timeout", "local")
+
+    def __init__(self, path: str, timeout: float = 30.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS store "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = (
+            self._connection()
+            .execute("SELECT value FROM store WHERE key = ?", (key,))
+            .fetchone()
+        )
+
+        return pickle.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any) -> None:
+        value = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO store (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM store WHERE key = ?", (key,))
+
+    def clear(self, prefix: str = "") -> None:
+        with self._connection() as connection:
+            connection.execute(
+                "DELETE FROM store WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+
+    def _connection(self) -> "sqlite3.Connection":
+        return _sqlite_connection(self.local, self.path, self.timeout)
+
+
+def _sqlite_connection(
+    local: threading.local, path: str, timeout: float
+) -> "sqlite3.Connection":
+    # Return the connection to the database of the current thread, since
+    # connections cannot be shared between threads. Write-ahead logging allows
+    # readers to continue while another connection writes.
+    connection = getattr(local, "connection", None)
+
+    if connection is None:
+        import sqlite3
+
+        connection = sqlite3.connect(path, timeout=timeout)
+        connection.execute("PRAGMA journal_mode=WAL")
+        local.connection = connection
+
+    return connection
@@ -0,0 +1,127 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+
+class Transport(object):
+    """
+    Base class for the HTTP layer of an Eetlijst client. A transport performs
+    GET and POST requests and returns response objects that provide at least a
+    `status_code`, `url` and `content` attribute.
+
+    Subclass this to use another HTTP stack, or to fake responses in tests.
+    """
+
+    __slots__ = ()
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> Any:
+        """
+        Perform a GET request. The `headers` are only passed for conditional
+        requests, and responses may provide them via a `headers` attribute.
+        """
+
+        raise NotImplementedError
+
+    def post(self, url: str, data: Optional[dict[str, Any]] = None) -> Any:
+        """
+        Perform a POST request.
+        """
+
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """
+        Release all resources held by this transport.
+        """
+
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    Transport backed by a `requests.Session`. Connections are pooled and kept
+    alive between requests, so subsequent requests to Eetlijst.nl do not pay
+    for a new TCP and TLS handshake.
+
+    Failed GET requests (connection errors and 5xx responses) are retried with
+    an exponential backoff. POST requests are never retried, because they are
+    not idempotent.
+
+    Cookies are not kept between requests. Eetlijst.nl identifies sessions by
+    the `session_id` parameter only, and a transport may be shared by clients
+    of different accounts.
+    """
+
+    __slots__ = ("session", "timeout")
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        timeout: Optional[float] = 30.0,
+        keep_alive: bool = True,
+    ) -> None:
+        """
+        Construct a new transport. The `pool_size` is the maximum number of
+        connections kept open, which should be at least the number of threads
+        that share this transport.
+        """
+
+        import http.cookiejar
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.cookies.set_policy(
+            http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+        self.timeout = timeout
+
+    def get(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        headers: Optional[dict[str, str]] = None,
+    ) -> "requests.Response":
+        return self.session.get(
+            url, params=params, headers=headers, timeout=self.timeout
+        )
+
+    def post(
+        self, url: str, data: Optional[dict[str, Any]] = None
+    ) -> "requests.Response":
+        return self.session.post(url, data=data, timeout=self.timeout)
+
+    def close(self) -> None:
+        self.session.close()
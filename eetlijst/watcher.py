@@ -0,0 +1,272 @@
+# Unofficial Python API to interface with Eetlijst.nl
+# Copyright (C) 2014-2022 Bas Stottelaar
+
+# See the LICENSE file for the full GPLv3 license
+
+import asyncio
+import threading
+from datetime import datetime
+from typing import AsyncIterator, Callable, Optional
+
+from .client import Eetlijst
+from .exceptions import Error
+from .models import TZ_UTC, MainPageSnapshot, get_timezone, now
+
+KINDS = ("status", "noticeboard", "deadline", "error")
+
+
+class WatchEvent(object):
+    """
+    Represent a change detected by a `Watcher`. The `kind` is one of:
+
+    status -> The status of `resident_index` for the day at `timestamp`
+              changed from `old` to `new`
+    noticeboard -> The noticeboard changed from `old` to `new`
+    deadline -> The deadline of the day at `timestamp` has passed
+    error -> Polling failed, and `new` is the exception
+    """
+
+    __slots__ = ("kind", "timestamp", "resident_index", "old", "new")
+
+    def __init__(
+        self, kind, timestamp=None, resident_index=None, old=None, new=None
+    ) -> None:
+        self.kind = kind
+        self.timestamp = timestamp
+        self.resident_index = resident_index
+        self.old = old
+        self.new = new
+
+    def __repr__(self) -> str:
+        return (
+            "WatchEvent(kind=%s, timestamp=%s, resident_index=%s, old=%r, new=%r)"
+            % (self.kind, self.timestamp, self.resident_index, self.old, self.new)
+        )
+
+
+class Watcher(object):
+    """
+    Poll the main page of an Eetlijst list, and emit events for changed
+    statuses, changes to the noticeboard and passed deadlines. Events are
+    passed to callbacks, or can be consumed using an async iterator.
+
+    The poll interval adapts to the list: every `min_interval` seconds during
+    the `near_deadline` seconds before a deadline, every `max_interval`
+    seconds at night, and every `interval` seconds otherwise. Polls use the
+    cache of the client, and other users of the client share the result. A
+    cached page is used until it expires, so changes are seen at most
+    `TIMEOUT_CACHE` seconds after the poll that would otherwise have seen them.
+    """
+
+    __slots__ = (
+        "client",
+        "min_interval",
+        "interval",
+        "max_interval",
+        "near_deadline",
+        "night",
+        "callbacks",
+        "snapshot",
+        "last_poll",
+        "stop_event",
+    )
+
+    def __init__(
+        self,
+        client: Eetlijst,
+        min_interval: float = 60.0,
+        interval: float = 300.0,
+        max_interval: float = 1800.0,
+        near_deadline: float = 3600.0,
+        night: tuple[int, int] = (0, 7),
+    ) -> None:
+        """
+        Construct a new watcher for the given client. The `night` is a tuple of
+        the first and last hour (exclusive) of the night, in the time zone of
+        Eetlijst.nl.
+        """
+
+        self.client = client
+
+        self.min_interval = min_interval
+        self.interval = interval
+        self.max_interval = max_interval
+        self.near_deadline = near_deadline
+        self.night = night
+
+        self.callbacks = {kind: [] for kind in KINDS}
+
+        self.snapshot = None
+        self.last_poll = None
+        self.stop_event = threading.Event()
+
+    def on(self, kind: str, callback: Callable[[WatchEvent], None]) -> None:
+        """
+        Register a callback for events of the given kind. If no callback is
+        registered for errors, then errors are raised by `run`.
+        """
+
+        if kind not in self.callbacks:
+            raise ValueError("Unknown event kind: %s" % kind)
+
+        self.callbacks[kind].append(callback)
+
+    def poll(self) -> list[WatchEvent]:
+        """
+        Retrieve the main page, and return the events since the previous poll.
+        The first poll only records the current state.
+        """
+
+        snapshot = self.client.get_snapshot()
+        moment = now()
+
+        previous, self.snapshot = self.snapshot, snapshot
+        last_poll, self.last_poll = self.last_poll, moment
+
+        if previous is None:
+            return []
+
+        return _compare(previous, snapshot, last_poll, moment)
+
+    def next_interval(self, moment: Optional[datetime] = None) -> float:
+        """
+        Return the number of seconds until the next poll.
+        """
+
+        moment = moment or now()
+        local = moment.astimezone(get_timezone())
+
+        if self.night[0] <= local.hour < self.night[1]:
+            interval = self.max_interval
+        else:
+            interval = self.interval
+
+        # Poll often just before a deadline, but do not sleep past the start of
+        # that period, or the deadline itself.
+        deadline = _next_deadline(self.snapshot, moment)
+
+        if deadline is not None:
+            left = (deadline - moment).total_seconds()
+
+            if left <= self.near_deadline:
+                interval = min(interval, self.min_interval, left)
+            else:
+                interval = min(interval, left - self.near_deadline)
+
+        return max(interval, 1.0)
+
+    def emit(self, event: WatchEvent) -> None:
+        """
+        Pass an event to the callbacks registered for its kind.
+        """
+
+        for callback in self.callbacks[event.kind]:
+            callback(event)
+
+    def run(self, iterations: Optional[int] = None) -> None:
+        """
+        Poll until `stop` is called, or until the given number of polls is
+        done, and pass all events to the callbacks.
+        """
+
+        count = 0
+
+        while not self.stop_event.is_set():
+            try:
+                events = self.poll()
+            except Error as e:
+                if not self.callbacks["error"]:
+                    raise
+
+                events = [WatchEvent("error", new=e)]
+
+            for event in events:
+                self.emit(event)
+
+            count += 1
+
+            if iterations is not None and count >= iterations:
+                break
+
+            self.stop_event.wait(self.next_interval())
+
+    def stop(self) -> None:
+        """
+        Stop a running watcher.
+        """
+
+        self.stop_event.set()
+
+    async def watch(self) -> AsyncIterator[WatchEvent]:
+        """
+        Poll until `stop` is called, and yield all events. Requests are
+        performed in a thread, so the event loop is not blocked.
+        """
+
+        loop = asyncio.get_running_loop()
+
+        while not self.stop_event.is_set():
+            for event in await loop.run_in_executor(None, self.poll):
+                yield event
+
+            await asyncio.sleep(self.next_interval())
+
+    def __aiter__(self) -> AsyncIterator[WatchEvent]:
+        return self.watch()
+
+
+def _next_deadline(
+    snapshot: Optional[MainPageSnapshot], moment: datetime
+) -> Optional[datetime]:
+    if snapshot is None or not snapshot.statuses.has_deadline:
+        return None
+
+    # The deadline of a row is its timestamp, so no rows have to be created.
+    for value in snapshot.statuses.timestamps:
+        deadline = datetime.fromtimestamp(value, tz=TZ_UTC)
+
+        if deadline > moment:
+            return deadline
+
+    return None
+
+
+def _compare(
+    previous: MainPageSnapshot,
+    snapshot: MainPageSnapshot,
+    last_poll: datetime,
+    moment: datetime,
+) -> list[WatchEvent]:
+    events = [
+        WatchEvent(
+            "status",
+            timestamp=change.timestamp,
+            resident_index=change.resident_index,
+            old=change.old,
+            new=change.new,
+        )
+        for change in previous.diff(snapshot)
+    ]
+
+    if previous.noticeboard != snapshot.noticeboard:
+        events.append(
+            WatchEvent(
+                "noticeboard", old=previous.noticeboard, new=snapshot.noticeboard
+            )
+        )
+
+    # Deadlines that passed since the previous poll. Rows that are not listed
+    # anymore are taken from the previous snapshot.
+    deadlines = set()
+
+    for table in (previous.statuses, snapshot.statuses):
+        if table.has_deadline:
+            deadlines.update(table.timestamps)
+
+    for value in sorted(deadlines):
+        deadline = datetime.fromtimestamp(value, tz=TZ_UTC)
+
+        if last_poll < deadline <= moment:
+            events.append(WatchEvent("deadline", timestamp=deadline))
+
+    return events
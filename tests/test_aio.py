@@ -0,0 +1,131 @@
+import asyncio
+import os
+import unittest
+
+import eetlijst
+from eetlijst.aio import AsyncEetlijst, AsyncResponse, AsyncTransport, gather_statuses
+
+
+def read_file(filename):
+    filename = os.path.join(os.path.dirname(__file__), "data", filename)
+
+    with open(filename, "rb") as fp:
+        return fp.read()
+
+
+class MockAsyncTransport(AsyncTransport):
+    """
+    Asynchronous transport that serves a fixed page for every list, and keeps
+    track of the number of requests in flight.
+    """
+
+    def __init__(self, filename, delay=0.01):
+        self.content = read_file(filename)
+        self.delay = delay
+        self.counter = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, url, params=None):
+        self.counter += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        await asyncio.sleep(self.delay)
+
+        self.in_flight -= 1
+
+        if url.endswith("login.php"):
+            if params["pass"] != "test":
+                return AsyncResponse(200, eetlijst.BASE_URL + "login.php?r=failed", b"")
+
+            session_id = "%032d" % self.counter
+        else:
+            session_id = params["session_id"]
+
+        return AsyncResponse(
+            200, eetlijst.BASE_URL + "main.php?session_id=" + session_id, self.content
+        )
+
+
+class AsyncEetlijstTest(unittest.IsolatedAsyncioTestCase):
+    """
+    Test cases for the asynchronous client.
+    """
+
+    async def test_statuses(self):
+        """
+        Test that the asynchronous client returns the same statuses.
+        """
+
+        transport = MockAsyncTransport("test_main.html")
+        client = AsyncEetlijst(username="test", password="test", transport=transport)
+
+        rows = await client.get_statuses(limit=2)
+
+        self.assertListEqual(
+            [status.value for status in rows[1].statuses], [1, -3, 0, 0, 0]
+        )
+        self.assertEqual(await client.get_name(), "Python-eetlijst")
+        self.assertEqual(len(await client.get_residents()), 5)
+        self.assertEqual(transport.counter, 1)
+
+    async def test_login_failed(self):
+        """
+        Test unsuccesful login.
+        """
+
+        transport = MockAsyncTransport("test_main.html")
+        client = AsyncEetlijst(username="test", password="invalid", transport=transport)
+
+        with self.assertRaises(eetlijst.LoginError):
+            await client.login()
+
+    async def test_login_concurrent(self):
+        """
+        Test that concurrent requests on one client login only once.
+        """
+
+        transport = MockAsyncTransport("test_main.html")
+        client = AsyncEetlijst(username="test", password="test", transport=transport)
+
+        await asyncio.gather(*[client.get_name() for _ in range(10)])
+
+        self.assertEqual(transport.counter, 1)
+
+    async def test_clear_cache_concurrent(self):
+        """
+        Test that clearing the cache while a request is in flight does not
+        break that request.
+        """
+
+        transport = MockAsyncTransport("test_main.html")
+        client = AsyncEetlijst(
+            session_id="bc731753a2d0fecccf12518759108b5b", transport=transport
+        )
+
+        async def clear_cache():
+            await asyncio.sleep(transport.delay / 2)
+            client.clear_cache()
+
+        name, _ = await asyncio.gather(client.get_name(), clear_cache())
+
+        self.assertEqual(name, "Python-eetlijst")
+        self.assertEqual(client.get_session_id(), "bc731753a2d0fecccf12518759108b5b")
+
+    async def test_gather_statuses(self):
+        """
+        Test polling many lists with bounded concurrency.
+        """
+
+        transport = MockAsyncTransport("test_main.html")
+        clients = [
+            AsyncEetlijst(session_id="%032d" % index, transport=transport)
+            for index in range(20)
+        ]
+
+        results = await gather_statuses(clients, limit=1, concurrency=5)
+
+        self.assertEqual(len(results), 20)
+        self.assertEqual(transport.counter, 20)
+        self.assertEqual(transport.max_in_flight, 5)
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import eetlijst
+from eetlijst import bench
+from eetlijst.archive import Archive, ArchiveTotals
+
+START = datetime(2022, 11, 14, 15, tzinfo=eetlijst.TZ_UTC)
+
+
+class ArchiveTest(unittest.TestCase):
+    """
+    Test cases for the status archive.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.archive = Archive(os.path.join(self.directory.name, "archive.db"))
+
+    def tearDown(self):
+        self.archive.close()
+        self.directory.cleanup()
+
+    def test_record(self):
+        """
+        Test that unchanged records are not written twice, and that records of
+        past days are kept.
+        """
+
+        snapshot = eetlijst.parse_main_page(bench.generate_page(days=3, start=START))
+        residents = snapshot.residents
+
+        self.assertEqual(self.archive.record(residents, snapshot.statuses), 15)
+        self.assertEqual(self.archive.record(residents, snapshot.statuses), 0)
+        self.assertEqual(self.archive.record(residents, list(snapshot.statuses)), 0)
+
+        # One day later, the first day is gone and one day is added.
+        table = eetlijst.parse_statuses(
+            bench.generate_page(days=3, seed=1, start=START + timedelta(days=1))
+        )
+        changes = sum(
+            row.statuses[index].value != new.statuses[index].value
+            for row, new in zip(snapshot.statuses[1:], table)
+            for index in range(5)
+        )
+
+        self.assertEqual(self.archive.record(residents, table), 5 + changes)
+
+        records = list(self.archive.iter_statuses())
+
+        self.assertEqual(len(records), 20)
+        self.assertEqual(
+            records[0], (START, "Resident0", snapshot.statuses[0].statuses[0].value)
+        )
+        self.assertEqual(
+            records[-1],
+            (START + timedelta(days=3), "Resident4", table[-1].statuses[4].value),
+        )
+
+        records = list(
+            self.archive.iter_statuses(
+                START + timedelta(days=1), START + timedelta(days=2)
+            )
+        )
+        self.assertEqual(
+            [record[2] for record in records],
+            [status.value for status in table[0].statuses],
+        )
+
+        self.assertEqual(list(self.archive.iter_statuses(list_name="other")), [])
+
+    def test_totals(self):
+        """
+        Test that the aggregates match those of a StatusTable.
+        """
+
+        table = eetlijst.parse_statuses(bench.generate_page(days=30, start=START))
+        residents = ["Resident%d" % index for index in range(5)]
+
+        self.archive.record(residents, table, list_name="list")
+
+        totals = self.archive.totals(list_name="list")
+        summary = table.summarize()
+
+        self.assertEqual(list(totals), residents)
+
+        for index, name in enumerate(residents):
+            self.assertEqual(
+                totals[name],
+                ArchiveTotals(
+                    days=30,
+                    count=summary.count_per_resident[index],
+                    cooks=summary.cooks_per_resident[index],
+                    diners=summary.diners_per_resident[index],
+                    guests=summary.guests_per_resident[index],
+                    absent=summary.absent_per_resident[index],
+                    unknown=summary.unknown_per_resident[index],
+                ),
+            )
+
+        totals = self.archive.totals(end=START + timedelta(days=10), list_name="list")
+        self.assertEqual(totals["Resident0"].days, 10)
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import eetlijst
+from eetlijst import bench
+from eetlijst.archive import Archive
+from eetlijst.balance import Balance
+
+START = datetime(2022, 11, 14, 15, tzinfo=eetlijst.TZ_UTC)
+NAMES = ["Resident%d" % index for index in range(8)]
+
+
+class BalanceTest(unittest.TestCase):
+    """
+    Test cases for the balance engine.
+    """
+
+    def assertBalanceEqual(self, balance, expected):
+        self.assertEqual(set(balance.residents), set(expected.residents))
+
+        for name, resident in expected.residents.items():
+            for attribute in ("cooks", "diners", "guests", "absent"):
+                self.assertEqual(
+                    getattr(balance[name], attribute), getattr(resident, attribute)
+                )
+
+            self.assertEqual(balance[name].points, resident.points)
+
+    def test_day(self):
+        """
+        Test the points and totals of a single day.
+        """
+
+        balance = Balance()
+        balance.set_day(START, {"A": 1, "B": -2, "C": 0, "D": None})
+
+        self.assertEqual(balance["A"].points, 2)
+        self.assertEqual(balance["B"].points, -2)
+        self.assertEqual(balance["C"].points, 0)
+        self.assertEqual(balance["B"].guests, 1)
+        self.assertEqual(balance["C"].absent, 1)
+        self.assertEqual(balance["A"].get_ratio(), 1.0)
+        self.assertEqual(balance["B"].get_ratio(), 0.0)
+        self.assertIsNone(balance["D"].get_ratio())
+
+        # Two cooks share the points.
+        balance.set_day(START, {"A": 1, "B": 1, "C": -2, "D": None})
+
+        self.assertEqual(balance["A"].points, 1)
+        self.assertEqual(balance["C"].points, -2)
+        self.assertEqual(balance["C"].absent, 0)
+
+        # Without a cook, no points are exchanged.
+        balance.set_day(START + timedelta(days=1), {"A": -1, "B": -1})
+        self.assertEqual(balance["A"].points, 1)
+
+        balance.remove_day(START)
+        self.assertEqual(balance["A"].diners, 1)
+        self.assertEqual(balance["A"].cooks, 0)
+
+    def test_incremental(self):
+        """
+        Test that changing days gives the same result as recomputing the whole
+        history.
+        """
+
+        table = bench.generate_history(days=100)
+
+        balance = Balance()
+        balance.update(NAMES, table)
+        balance.update(NAMES, table[-10:])
+
+        self.assertEqual(len(balance.days), 100)
+        self.assertAlmostEqual(
+            sum(resident.points for resident in balance.residents.values()), 0
+        )
+
+        # Change the statuses of the last day.
+        table.values[-8:] = table.values[:8]
+        balance.update(NAMES, table[-1:])
+
+        expected = Balance()
+        expected.update(NAMES, list(table))
+
+        self.assertBalanceEqual(balance, expected)
+
+    def test_exact(self):
+        """
+        Test that points do not drift when days are changed many times.
+        """
+
+        balance = Balance()
+        days = [
+            {"A": 1, "B": 1, "C": 1, "D": -1},
+            {"A": 1, "B": -3, "C": 1, "D": None},
+            {"A": -1, "B": 1, "C": 1, "D": 1},
+        ]
+
+        for index in range(3000):
+            balance.set_day(START, days[index % 3])
+            balance.set_day(START + timedelta(days=1), days[(index + 1) % 3])
+
+        expected = Balance()
+        expected.set_day(START, days[2999 % 3])
+        expected.set_day(START + timedelta(days=1), days[3000 % 3])
+
+        self.assertBalanceEqual(balance, expected)
+        self.assertEqual(
+            sum(resident.points for resident in balance.residents.values()), 0
+        )
+
+    def test_archive(self):
+        """
+        Test that a balance can be computed from an archive.
+        """
+
+        table = bench.generate_history(days=30)
+
+        with tempfile.TemporaryDirectory() as directory:
+            archive = Archive(os.path.join(directory, "archive.db"))
+            archive.record(NAMES, table)
+
+            balance = Balance()
+            balance.update_archive(archive)
+            archive.close()
+
+        expected = Balance()
+        expected.update(NAMES, table)
+
+        self.assertBalanceEqual(balance, expected)
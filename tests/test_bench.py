@@ -0,0 +1,54 @@
+import json
+import unittest
+
+import eetlijst
+from eetlijst import bench
+
+
+class BenchTest(unittest.TestCase):
+    """
+    Test cases for the benchmark suite.
+    """
+
+    def test_generate_page(self):
+        """
+        Test that synthetic pages can be scraped by all parser backends.
+        """
+
+        content = bench.generate_page(residents=50, days=60)
+        expected = eetlijst.parse_main_page(content, parser="html.parser")
+
+        self.assertEqual(len(expected.residents), 50)
+        self.assertEqual(len(expected.statuses), 60)
+
+        for row in expected.statuses:
+            self.assertEqual(len(row.statuses), 50)
+            self.assertIsNotNone(row.deadline)
+
+        snapshot = eetlijst.parse_main_page(content, parser="fast")
+
+        self.assertEqual(snapshot.name, expected.name)
+        self.assertEqual(snapshot.residents, expected.residents)
+        self.assertEqual(snapshot.noticeboard, expected.noticeboard)
+
+    def test_requests(self):
+        """
+        Test the number of requests per high-level operation.
+        """
+
+        requests = bench.measure_requests()
+
+        self.assertEqual(requests["login"], {"GET": 1, "POST": 0})
+        self.assertEqual(requests["get_statuses_warm"], {"GET": 0, "POST": 0})
+        self.assertEqual(requests["set_status_multi_step"], {"GET": 0, "POST": 3})
+
+    def test_run(self):
+        """
+        Test that the results can be serialized.
+        """
+
+        results = bench.run(sizes=[(5, 7)], repeat=1, history_days=30)
+
+        self.assertIn("synthetic_5x7", results["pages"])
+        self.assertEqual(results["balance"]["days"], 30)
+        self.assertEqual(json.loads(json.dumps(results)), results)
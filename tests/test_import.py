@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import eetlijst
+from eetlijst import bench
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportTest(unittest.TestCase):
+    """
+    Test cases for the startup time of the package.
+    """
+
+    def test_lazy_imports(self):
+        """
+        Test that importing the package does not import heavy dependencies.
+        """
+
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import eetlijst"],
+            cwd=ROOT,
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        modules = bench.parse_import_times(result.stderr)
+
+        self.assertIn("eetlijst", modules)
+
+        for module in ("requests", "urllib3", "bs4", "pytz", "numpy", "sqlite3"):
+            self.assertNotIn(module, modules)
+
+    def test_exports(self):
+        """
+        Test that the names of the single-module package are still exported.
+        """
+
+        for name in (
+            "RE_DIGIT",
+            "RE_JAVASCRIPT_K",
+            "RE_JAVASCRIPT_VS_1",
+            "RE_JAVASCRIPT_VS_2",
+            "RE_LAST_CHANGED",
+            "RE_RESIDENTS",
+            "TZ_EETLIJST",
+            "TIMEOUT_CACHE",
+            "TIMEOUT_SESSION",
+            "BASE_URL",
+            "now",
+            "timeout",
+        ):
+            self.assertTrue(hasattr(eetlijst, name), name)
+
+    def test_measure_import(self):
+        """
+        Test the startup benchmark.
+        """
+
+        result = bench.measure_import(repeat=1)
+
+        self.assertGreater(result["median"], 0)
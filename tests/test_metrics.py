@@ -0,0 +1,151 @@
+import importlib.util
+import unittest
+
+import eetlijst
+from eetlijst.metrics import LoggingMetrics, MemoryMetrics, PrometheusMetrics
+
+from .test_module import MockResponse, MockTransport
+
+URL = "https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b"
+
+
+class MetricsTest(unittest.TestCase):
+    """
+    Test cases for the instrumentation of the client.
+    """
+
+    def setUp(self):
+        self.responses = []
+        self.transport = MockTransport(
+            get=lambda url, **kwargs: self.responses.pop(), post=None
+        )
+
+        self.timeouts = (eetlijst.TIMEOUT_SESSION, eetlijst.TIMEOUT_CACHE)
+
+    def tearDown(self):
+        eetlijst.TIMEOUT_SESSION, eetlijst.TIMEOUT_CACHE = self.timeouts
+
+    def test_counters(self):
+        """
+        Test that requests, cache hits and parses are recorded.
+        """
+
+        self.responses = [MockResponse.from_file("test_main.html", url=URL)]
+        metrics = MemoryMetrics()
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport, metrics=metrics
+        )
+        client.get_name()
+        client.get_statuses()
+
+        self.assertEqual(metrics.counters["requests"], 1)
+        self.assertEqual(metrics.counters["logins"], 1)
+        self.assertEqual(metrics.counters["cache_hits"], 2)
+        self.assertEqual(metrics.counters["cache_misses"], 0)
+        self.assertEqual(len(metrics.observations["request_seconds"]), 1)
+        self.assertGreater(metrics.observations["response_bytes"][0], 0)
+        self.assertEqual(len(metrics.observations["parse_seconds"]), 1)
+
+    def test_retries(self):
+        """
+        Test that expired pages and session renewals are recorded.
+        """
+
+        self.responses = [
+            MockResponse.from_file("test_main.html", url=URL),
+            MockResponse.from_file("test_main.html", url=URL),
+            MockResponse.from_file(
+                "test_login_failed.html",
+                url="https://www.eetlijst.nl/login.php?r=failed",
+            ),
+            MockResponse.from_file("test_main.html", url=URL),
+        ]
+        metrics = MemoryMetrics()
+
+        eetlijst.TIMEOUT_CACHE = 0
+        client = eetlijst.Eetlijst(
+            username="test",
+            password="test",
+            session_id="99ee78cf04dbea386a90b57743411b3d",
+            transport=self.transport,
+            metrics=metrics,
+        )
+        client.get_name()
+        client.get_name()
+
+        self.assertEqual(metrics.counters["cache_misses"], 1)
+        self.assertEqual(metrics.counters["cache_expired"], 1)
+        self.assertEqual(metrics.counters["retries"], 1)
+        self.assertEqual(metrics.counters["logins"], 1)
+        self.assertEqual(metrics.counters["requests"], 4)
+
+    def test_logging(self):
+        """
+        Test the logging adapter.
+        """
+
+        metrics = LoggingMetrics()
+
+        with self.assertLogs("eetlijst", level="DEBUG") as logs:
+            metrics.increment("requests", method="GET", status="200")
+            metrics.observe("request_seconds", 0.25, method="GET")
+
+        self.assertEqual(
+            logs.output,
+            [
+                "DEBUG:eetlijst:requests +1 method=GET status=200",
+                "DEBUG:eetlijst:request_seconds 0.25 method=GET",
+            ],
+        )
+
+    @unittest.skipIf(
+        importlib.util.find_spec("prometheus_client") is None,
+        "prometheus_client is not installed",
+    )
+    def test_prometheus(self):
+        """
+        Test the Prometheus adapter.
+        """
+
+        import prometheus_client
+
+        registry = prometheus_client.CollectorRegistry()
+        metrics = PrometheusMetrics(registry=registry)
+
+        metrics.increment("requests", method="GET", status="200")
+        metrics.observe("request_seconds", 0.25, method="GET")
+
+        self.assertEqual(
+            registry.get_sample_value(
+                "eetlijst_requests_total", {"method": "GET", "status": "200"}
+            ),
+            1,
+        )
+        self.assertEqual(
+            registry.get_sample_value(
+                "eetlijst_request_seconds_count", {"method": "GET"}
+            ),
+            1,
+        )
+
+        # Sizes are counted in byte-sized buckets.
+        for size in (500, 20000, 40000, 2000000):
+            metrics.observe("response_bytes", size, method="GET")
+
+        def bucket(le):
+            return registry.get_sample_value(
+                "eetlijst_response_bytes_bucket", {"method": "GET", "le": le}
+            )
+
+        self.assertEqual(bucket("1000.0"), 1)
+        self.assertEqual(bucket("10000.0"), 1)
+        self.assertEqual(bucket("50000.0"), 3)
+        self.assertEqual(bucket("1e+06"), 3)
+        self.assertEqual(bucket("+Inf"), 4)
+        self.assertEqual(
+            registry.get_sample_value(
+                "eetlijst_request_seconds_bucket", {"method": "GET", "le": "0.25"}
+            ),
+            1,
+        )
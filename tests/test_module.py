@@ -1,11 +1,15 @@
+import importlib.util
 import os
+import pickle
+import re
+import threading
 import time
 import unittest
-from datetime import datetime
-
-import requests
+from datetime import datetime, timedelta
+from unittest import mock
 
 import eetlijst
+from eetlijst import bench, parsing
 
 
 class MockResponse(object):
@@ -28,10 +32,28 @@ class MockResponse(object):
         return MockResponse(content, status_code, url)
 
 
+class MockTransport(eetlijst.Transport):
+    """
+    Transport that delegates requests to callables, instead of performing
+    actual HTTP requests.
+    """
+
+    def __init__(self, get, post):
+        self.get = get
+        self.post = post
+
+
+def _values(rows):
+    return [
+        (row.timestamp, [(x.value, x.last_changed) for x in row.statuses])
+        for row in rows
+    ]
+
+
 class EetlijstTest(unittest.TestCase):
     """
-    Test cases for `eetlijst.py'. The module `requests' is monkey patched to
-    mimic results of actual requests. In addition, the number of requests is
+    Test cases for `eetlijst.py'. A mock transport is injected to mimic results
+    of actual requests. In addition, the number of requests is
     logged to track all cach hits or misses.
 
     GET requests should be put in `self.test_get_response' and POST requests in
@@ -43,10 +65,15 @@ class EetlijstTest(unittest.TestCase):
     """
 
     def setUp(self):
-        requests.get = self.patched_get
-        requests.post = self.patched_post
+        self.transport = MockTransport(get=self.patched_get, post=self.patched_post)
 
         self.counter = 0
+        self.posted = []
+
+        self.timeouts = (eetlijst.TIMEOUT_SESSION, eetlijst.TIMEOUT_CACHE)
+
+    def tearDown(self):
+        eetlijst.TIMEOUT_SESSION, eetlijst.TIMEOUT_CACHE = self.timeouts
 
     def patched_get(self, url, *args, **kwargs):
         self.counter += 1
@@ -54,6 +81,7 @@ class EetlijstTest(unittest.TestCase):
 
     def patched_post(self, url, *args, **kwargs):
         self.counter += 1
+        self.posted.append(kwargs.get("data"))
         return self.test_post_response.pop()
 
     def test_login(self):
@@ -69,7 +97,9 @@ class EetlijstTest(unittest.TestCase):
         ]
 
         try:
-            eetlijst.Eetlijst(username="test", password="test", login=True)
+            eetlijst.Eetlijst(
+                username="test", password="test", login=True, transport=self.transport
+            )
         except eetlijst.LoginError:
             self.fail("LoginError raised")
 
@@ -78,7 +108,9 @@ class EetlijstTest(unittest.TestCase):
         Test login/continuation of existing session.
         """
 
-        client = eetlijst.Eetlijst(session_id="bc731753a2d0fecccf12518759108b5b")
+        client = eetlijst.Eetlijst(
+            session_id="bc731753a2d0fecccf12518759108b5b", transport=self.transport
+        )
 
         self.assertEqual(client.username, None)
         self.assertEqual(client.password, None)
@@ -107,6 +139,7 @@ class EetlijstTest(unittest.TestCase):
             password="test",
             session_id="99ee78cf04dbea386a90b57743411b3d",
             login=True,
+            transport=self.transport,
         )
 
         self.assertEqual(self.counter, 2)
@@ -124,7 +157,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(session_id="bc731753a2d0fecccf12518759108b5b")
+        client = eetlijst.Eetlijst(
+            session_id="bc731753a2d0fecccf12518759108b5b", transport=self.transport
+        )
 
         with self.assertRaises(eetlijst.LoginError):
             client.get_name()
@@ -153,7 +188,12 @@ class EetlijstTest(unittest.TestCase):
         ]
 
         with self.assertRaises(eetlijst.LoginError):
-            eetlijst.Eetlijst(username="test", password="invalid", login=True)
+            eetlijst.Eetlijst(
+                username="test",
+                password="invalid",
+                login=True,
+                transport=self.transport,
+            )
 
     def test_clear_cache(self):
         """
@@ -171,7 +211,9 @@ class EetlijstTest(unittest.TestCase):
             ),
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test", login=True)
+        client = eetlijst.Eetlijst(
+            username="test", password="test", login=True, transport=self.transport
+        )
 
         self.assertEqual(client.get_session_id(), "99ee78cf04dbea386a90b57743411b3d")
         self.assertEqual(self.counter, 1)
@@ -186,6 +228,19 @@ class EetlijstTest(unittest.TestCase):
         self.assertEqual(client.get_session_id(), "bc731753a2d0fecccf12518759108b5b")
         self.assertEqual(self.counter, 2)
 
+        # Clearing the cache while a session is in use does not break it.
+        get = type(client.cache).get
+
+        def _get_and_clear(cache, key, *args):
+            value = get(cache, key, *args)
+            cache.clear()
+            return value
+
+        with mock.patch.object(type(client.cache), "get", _get_and_clear):
+            self.assertEqual(
+                client._get_session(renew=False), "bc731753a2d0fecccf12518759108b5b"
+            )
+
     def test_timeout_session(self):
         """
         Test session timeout and renewal.
@@ -203,7 +258,9 @@ class EetlijstTest(unittest.TestCase):
         ]
 
         eetlijst.TIMEOUT_SESSION = 2
-        client = eetlijst.Eetlijst(username="test", password="test", login=True)
+        client = eetlijst.Eetlijst(
+            username="test", password="test", login=True, transport=self.transport
+        )
 
         client.get_noticeboard()
         self.assertEqual(client.get_session_id(), "99ee78cf04dbea386a90b57743411b3d")
@@ -234,7 +291,9 @@ class EetlijstTest(unittest.TestCase):
         ]
 
         eetlijst.TIMEOUT_SESSION = 2
-        client = eetlijst.Eetlijst(username="test", password="test", login=True)
+        client = eetlijst.Eetlijst(
+            username="test", password="test", login=True, transport=self.transport
+        )
 
         client.get_noticeboard()
         self.assertEqual(client.get_session_id(), "bc731753a2d0fecccf12518759108b5b")
@@ -276,7 +335,9 @@ class EetlijstTest(unittest.TestCase):
 
         eetlijst.TIMEOUT_SESSION = 10
         eetlijst.TIMEOUT_CACHE = 2
-        client = eetlijst.Eetlijst(username="test", password="test", login=True)
+        client = eetlijst.Eetlijst(
+            username="test", password="test", login=True, transport=self.transport
+        )
 
         client.get_noticeboard()
         self.assertEqual(client.get_session_id(), "99ee78cf04dbea386a90b57743411b3d")
@@ -294,6 +355,147 @@ class EetlijstTest(unittest.TestCase):
         self.assertEqual(client.get_session_id(), "99ee78cf04dbea386a90b57743411b3d")
         self.assertEqual(self.counter, 2)
 
+    def test_threads(self):
+        """
+        Test that concurrent callers share one login and one page request.
+        """
+
+        lock = threading.Lock()
+
+        def slow_get(url, *args, **kwargs):
+            time.sleep(0.1)
+
+            with lock:
+                self.counter += 1
+
+            return MockResponse.from_file(
+                "test_main.html",
+                url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+            )
+
+        for kwargs in [
+            {"session_id": "bc731753a2d0fecccf12518759108b5b"},
+            {"username": "test", "password": "test"},
+        ]:
+            self.counter = 0
+
+            client = eetlijst.Eetlijst(
+                transport=MockTransport(get=slow_get, post=None), **kwargs
+            )
+            barrier = threading.Barrier(50)
+            results = []
+
+            def _worker():
+                barrier.wait()
+                results.append(client.get_statuses(limit=1)[0].statuses[0].value)
+
+            threads = [threading.Thread(target=_worker) for _ in range(50)]
+
+            for thread in threads:
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(results, [-1] * 50)
+            self.assertEqual(self.counter, 1)
+
+    def test_timeout_page_stale(self):
+        """
+        Test that an expired page is served while it is refreshed.
+        """
+
+        self.test_get_response = [
+            MockResponse.from_file(
+                "test_main2.html",
+                url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+            ),
+            MockResponse.from_file(
+                "test_main.html",
+                url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+            ),
+        ]
+
+        eetlijst.TIMEOUT_CACHE = 1
+        client = eetlijst.Eetlijst(
+            session_id="bc731753a2d0fecccf12518759108b5b",
+            transport=self.transport,
+            max_stale=60,
+        )
+
+        self.assertEqual(client.get_noticeboard(), "This is a test message!")
+        self.assertEqual(self.counter, 1)
+
+        time.sleep(2)
+
+        # Stale page is served, while the refresh is in flight.
+        self.assertEqual(client.get_noticeboard(), "This is a test message!")
+
+        # Wait for the refresh to complete.
+        for _ in range(100):
+            if not client.flights:
+                break
+
+            time.sleep(0.01)
+
+        self.assertEqual(self.counter, 2)
+        self.assertEqual(
+            client.get_noticeboard(),
+            "This is a test message!\n\n\nwww.github.com/basilfx",
+        )
+
+    def test_timeout_page_stale_error(self):
+        """
+        Test that a failed refresh of an expired page is not raised in the
+        background, and is tried again by the next caller.
+        """
+
+        response = MockResponse.from_file(
+            "test_main.html",
+            url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+        )
+        self.test_get_response = [response, OSError("Connection reset"), response]
+
+        def patched_get(url, *args, **kwargs):
+            result = self.patched_get(url, *args, **kwargs)
+
+            if isinstance(result, Exception):
+                raise result
+
+            return result
+
+        eetlijst.TIMEOUT_CACHE = 1
+        client = eetlijst.Eetlijst(
+            session_id="bc731753a2d0fecccf12518759108b5b",
+            transport=MockTransport(get=patched_get, post=None),
+            max_stale=60,
+        )
+
+        self.assertEqual(client.get_name(), "Python-eetlijst")
+        time.sleep(1.5)
+
+        with mock.patch("threading.excepthook") as excepthook:
+            self.assertEqual(client.get_name(), "Python-eetlijst")
+
+            for _ in range(100):
+                if not client.flights:
+                    break
+
+                time.sleep(0.01)
+
+        excepthook.assert_not_called()
+        self.assertEqual(self.counter, 2)
+
+        self.assertEqual(client.get_name(), "Python-eetlijst")
+
+        for _ in range(100):
+            if not client.flights:
+                break
+
+            time.sleep(0.01)
+
+        self.assertEqual(self.counter, 3)
+
     def test_name(self):
         """
         Test list name retrieval.
@@ -306,7 +508,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
 
         self.assertEqual(client.get_name(), "Python-eetlijst")
         self.assertEqual(self.counter, 1)
@@ -323,7 +527,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
 
         self.assertEqual(client.get_noticeboard(), "This is a test message!")
         self.assertEqual(self.counter, 1)
@@ -340,7 +546,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
 
         self.assertEqual(
             client.get_noticeboard(),
@@ -360,7 +568,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
         residents = client.get_residents()
 
         self.assertListEqual(
@@ -380,7 +590,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
         rows = client.get_statuses(limit=2)
 
         self.assertListEqual(
@@ -438,7 +650,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
         rows = client.get_statuses(limit=1)
 
         self.assertEqual(
@@ -502,8 +716,58 @@ class EetlijstTest(unittest.TestCase):
             ),
         )
 
+        moment = datetime(2014, 8, 28, 12, 30, tzinfo=eetlijst.TZ_UTC)
+
+        self.assertTrue(client.changed_since(moment - timedelta(minutes=1)))
+        self.assertFalse(client.changed_since(moment))
+
         self.assertEqual(self.counter, 1)
 
+    def test_timeout_page_conditional(self):
+        """
+        Test that an expired page is revalidated using the validators of the
+        previous response.
+        """
+
+        response = MockResponse.from_file(
+            "test_main.html",
+            url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+        )
+        response.headers = {"ETag": '"1"', "Last-Modified": "Mon, 14 Nov 2022"}
+
+        self.test_get_response = [
+            MockResponse(b"", status_code=304),
+            MockResponse(b"", status_code=304),
+            response,
+        ]
+        headers_sent = []
+
+        def patched_get(url, params=None, headers=None):
+            self.counter += 1
+            headers_sent.append(headers)
+            return self.test_get_response.pop()
+
+        self.transport.get = patched_get
+
+        eetlijst.TIMEOUT_CACHE = 0
+        client = eetlijst.Eetlijst(
+            session_id="bc731753a2d0fecccf12518759108b5b", transport=self.transport
+        )
+
+        snapshot = client.get_snapshot()
+
+        self.assertEqual(client.get_name(), "Python-eetlijst")
+        self.assertIs(client.get_snapshot(), snapshot)
+        self.assertEqual(
+            headers_sent,
+            [
+                None,
+                {"If-None-Match": '"1"', "If-Modified-Since": "Mon, 14 Nov 2022"},
+                {"If-None-Match": '"1"', "If-Modified-Since": "Mon, 14 Nov 2022"},
+            ],
+        )
+        self.assertEqual(self.counter, 3)
+
     def test_statuses_extra(self):
         """
         Test resident dinner statuses when they exceed -4 or 4.
@@ -516,7 +780,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
         rows = client.get_statuses(limit=2)
 
         self.assertListEqual(
@@ -549,7 +815,9 @@ class EetlijstTest(unittest.TestCase):
             )
         ]
 
-        client = eetlijst.Eetlijst(username="test", password="test")
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
         rows = client.get_statuses(limit=1)
 
         self.assertEqual(
@@ -580,18 +848,581 @@ class EetlijstTest(unittest.TestCase):
 
         self.assertEqual(self.counter, 1)
 
+    def test_snapshot(self):
+        """
+        Test that the main page is parsed only once for all getters.
+        """
+
+        self.test_get_response = [
+            MockResponse.from_file(
+                "test_main.html",
+                url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+            )
+        ]
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
+
+        self.assertEqual(client.get_name(), "Python-eetlijst")
+        snapshot = client.cache["main_page"][2]
+
+        self.assertIsInstance(snapshot, eetlijst.MainPageSnapshot)
+        self.assertEqual(client.get_noticeboard(), "This is a test message!")
+        self.assertEqual(len(client.get_residents()), 5)
+        self.assertEqual(len(client.get_statuses(limit=2)), 2)
+        self.assertIs(client.cache["main_page"][2], snapshot)
+
+        self.assertEqual(self.counter, 1)
+
+    def test_statuses_parser(self):
+        """
+        Test the status table parser on all pages.
+        """
+
+        for filename in [
+            "test_main.html",
+            "test_main2.html",
+            "test_main3.html",
+            "test_main4.html",
+        ]:
+            rows = eetlijst.parse_statuses(MockResponse.from_file(filename).content)
+
+            self.assertEqual(len(rows), 7)
+
+            for row in rows:
+                self.assertEqual(len(row.statuses), 5)
+
+        with self.assertRaises(eetlijst.ScrapingError):
+            eetlijst.parse_statuses(
+                MockResponse.from_file("test_login_failed.html").content
+            )
+
+    def test_timezones(self):
+        """
+        Test that both time zone backends give the same local times.
+        """
+
+        zones = [
+            eetlijst.get_timezone(backend) for backend in eetlijst.TIMEZONE_BACKENDS
+        ]
+
+        for hours in range(0, 24 * 365, 7):
+            moment = datetime(2022, 1, 1, tzinfo=eetlijst.TZ_UTC) + timedelta(
+                hours=hours
+            )
+            offsets = {moment.astimezone(zone).utcoffset() for zone in zones}
+
+            self.assertEqual(len(offsets), 1)
+
+        with mock.patch("eetlijst.TIMEZONE_BACKEND", "zoneinfo"):
+            self.assertIs(eetlijst.TZ_EETLIJST, zones[1])
+
+        with self.assertRaises(ValueError):
+            eetlijst.get_timezone("invalid")
+
+    def test_statuses_scan(self):
+        """
+        Test that the single-pass extraction gives the same result as the
+        status table parser, both at once and row by row, and falls back to it
+        for unusual markup.
+        """
+
+        pages = {
+            filename: MockResponse.from_file(filename).content
+            for filename in [
+                "test_main.html",
+                "test_main2.html",
+                "test_main3.html",
+                "test_main4.html",
+            ]
+        }
+        pages["synthetic"] = bench.generate_page(residents=20, days=30)
+        pages["synthetic_no_deadline"] = bench.generate_page(deadline=False)
+        pages["synthetic_comment"] = pages["synthetic"].replace(
+            b"<tr>", b"<!-- <tr><td>1</td></tr> --><tr>", 3
+        )
+
+        pages["synthetic_nested"] = pages["synthetic"].replace(
+            b'<td class="r">', b'<td class="r"><table><tr><td>1</td></tr></table>', 3
+        )
+
+        for name, content in pages.items():
+            expected = list(parsing._parse_status_table(content))
+
+            for method, rows in [
+                ("parse", eetlijst.parse_statuses(content)),
+                ("iter", list(eetlijst.iter_statuses(content))),
+                ("iter_small", list(eetlijst.iter_statuses(content, chunk_size=7))),
+            ]:
+                with self.subTest(page=name, method=method):
+                    self.assertEqual(len(rows), len(expected))
+
+                    for row, other in zip(rows, expected):
+                        self.assertEqual(row.timestamp, other.timestamp)
+                        self.assertEqual(row.deadline, other.deadline)
+                        self.assertEqual(
+                            [(x.value, x.last_changed) for x in row.statuses],
+                            [(x.value, x.last_changed) for x in other.statuses],
+                        )
+
+    def test_statuses_iter(self):
+        """
+        Test that statuses can be parsed row by row.
+        """
+
+        for filename in ["test_main.html", "test_main3.html", "test_main4.html"]:
+            content = MockResponse.from_file(filename).content
+            expected = _values(eetlijst.parse_statuses(content))
+
+            self.assertEqual(_values(eetlijst.iter_statuses(content)), expected)
+            self.assertEqual(
+                _values(eetlijst.iter_statuses(content, chunk_size=7)), expected
+            )
+
+        with self.assertRaises(eetlijst.ScrapingError):
+            list(
+                eetlijst.iter_statuses(
+                    MockResponse.from_file("test_login_failed.html").content
+                )
+            )
+
+        # Only the rows needed are parsed.
+        self.test_get_response = [
+            MockResponse(
+                bench.generate_page(days=60),
+                url=eetlijst.BASE_URL + "main.php?session_id=1",
+            )
+        ]
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
+
+        with mock.patch.object(
+            eetlijst.StatusTable,
+            "append",
+            autospec=True,
+            side_effect=eetlijst.StatusTable.append,
+        ) as append:
+            self.assertEqual(len(client.get_statuses(limit=1)), 1)
+            self.assertLess(append.call_count, 5)
+
+        self.assertIsNone(client.cache["main_page"][2])
+        self.assertEqual(len(list(client.iter_statuses())), 60)
+
+        client.get_name()
+        self.assertIsNotNone(client.cache["main_page"][2])
+        self.assertEqual(len(list(client.iter_statuses())), 60)
+        self.assertIs(client.get_statuses()[0], client.get_statuses()[0])
+        self.assertEqual(self.counter, 1)
+
+        # Callers cannot change the cached page.
+        client.get_residents().append("Resident")
+        client.get_statuses().clear()
+
+        self.assertEqual(len(client.get_residents()), 5)
+        self.assertEqual(len(client.get_statuses()), 60)
+        self.assertIsInstance(client.get_statuses()[0].statuses, tuple)
+
+    def test_statuses_limit(self):
+        """
+        Test that a limit has the same meaning, whether or not the page is
+        parsed already.
+        """
+
+        self.test_get_response = [
+            MockResponse(
+                bench.generate_page(days=10),
+                url=eetlijst.BASE_URL + "main.php?session_id=1",
+            )
+        ]
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
+
+        for parsed in (False, True):
+            with self.subTest(parsed=parsed):
+                if parsed:
+                    client.get_name()
+
+                with self.assertRaises(ValueError):
+                    client.get_statuses(limit=-1)
+
+                self.assertEqual(len(client.get_statuses(limit=3)), 3)
+                self.assertEqual(len(client.get_statuses(limit=20)), 10)
+                self.assertEqual(len(client.get_statuses(limit=0)), 10)
+
+        self.assertEqual(len(client.get_statuses(limit=None)), 10)
+        self.assertEqual(self.counter, 1)
+
+    def test_statuses_image_paths(self):
+        """
+        Test that status images are recognized by their file name, if they are
+        referred to by a path.
+        """
+
+        content = bench.generate_page(residents=4, days=6)
+        expected = _values(eetlijst.parse_statuses(content))
+
+        for prefix in (b"img/", b"/img/", eetlijst.BASE_URL.encode() + b"img/"):
+            with self.subTest(prefix=prefix):
+                prefixed = re.sub(
+                    rb'src="(\w+\.gif)"', rb'src="%s\1"' % prefix, content
+                )
+
+                self.assertNotEqual(prefixed, content)
+                self.assertEqual(_values(eetlijst.parse_statuses(prefixed)), expected)
+                self.assertEqual(_values(eetlijst.iter_statuses(prefixed)), expected)
+                self.assertEqual(
+                    _values(parsing._parse_status_table(prefixed)), expected
+                )
+
+    def test_statuses_table(self):
+        """
+        Test the compact status table.
+        """
+
+        content = bench.generate_page(residents=4, days=6)
+        table = eetlijst.parse_statuses(content)
+
+        self.assertIsInstance(table, eetlijst.StatusTable)
+        self.assertEqual(len(table.values), 24)
+
+        rows = list(table)
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(len(table[1:3]), 2)
+        self.assertEqual(table[-1].timestamp, rows[5].timestamp)
+        self.assertIsNotNone(rows[0].statuses[0].last_changed)
+        self.assertIsNone(rows[1].statuses[0].last_changed)
+
+        for index, row in enumerate(rows):
+            self.assertEqual(table.find(row.timestamp), index)
+
+            for resident_index, status in enumerate(row.statuses):
+                self.assertEqual(table.get_value(index, resident_index), status.value)
+
+        self.assertIn(None, [status.value for row in rows for status in row.statuses])
+        self.assertIsNone(table.find(rows[0].timestamp + timedelta(seconds=0.5)))
+
+        with self.assertRaises(IndexError):
+            table[6]
+
+        with self.assertRaises(IndexError):
+            table.get_value(0, 4)
+
+        # Rows are created once, until their values change.
+        self.assertIs(table[0], rows[0])
+        self.assertEqual(table[1:3], rows[1:3])
+
+        table.set_value(1, 0, 2)
+        self.assertIsNot(table[1], rows[1])
+        self.assertEqual(table[1].statuses[0].value, 2)
+        self.assertIs(table[2], rows[2])
+
+        # Created rows are not pickled.
+        copy = pickle.loads(pickle.dumps(table))
+        self.assertIsNone(copy.rows)
+        self.assertEqual(copy.values, table.values)
+        self.assertEqual(copy.fingerprint, table.fingerprint)
+
+    def test_statuses_summary(self):
+        """
+        Test the aggregates of the status table, with and without NumPy.
+        """
+
+        table = eetlijst.parse_statuses(bench.generate_page(residents=8, days=20))
+        rows = list(table)
+
+        summary = eetlijst.StatusSummary.from_table(table)
+
+        self.assertEqual(summary.count_per_day, [row.get_count() for row in rows])
+        self.assertEqual(summary.cooks_per_day, [len(row.get_cooks()) for row in rows])
+        self.assertEqual(
+            summary.diners_per_day, [len(row.get_diners()) for row in rows]
+        )
+        self.assertEqual(summary.absent_per_day, [len(row.get_nones()) for row in rows])
+        self.assertEqual(
+            summary.unknown_per_day, [len(row.get_unknowns()) for row in rows]
+        )
+        self.assertEqual(
+            summary.cooks_per_resident,
+            [sum(index in row.get_cooks() for row in rows) for index in range(8)],
+        )
+        self.assertEqual(
+            sum(summary.guests_per_day),
+            sum(summary.count_per_day)
+            - sum(summary.cooks_per_day)
+            - sum(summary.diners_per_day),
+        )
+        self.assertEqual(sum(summary.count_per_resident), sum(summary.count_per_day))
+
+        if importlib.util.find_spec("numpy") is not None:
+            self.assertEqual(repr(table.summarize()), repr(summary))
+
+        with mock.patch("eetlijst.USE_NUMPY", False):
+            self.assertEqual(repr(table.summarize()), repr(summary))
+
+        self.assertEqual(eetlijst.StatusTable().summarize().count_per_day, [])
+
+    def test_statuses_diff(self):
+        """
+        Test change detection between two snapshots.
+        """
+
+        old = eetlijst.parse_statuses(bench.generate_page(days=10, seed=1))
+        new = eetlijst.parse_statuses(bench.generate_page(days=10, seed=2))
+
+        expected = [
+            eetlijst.StatusChange(
+                index, old_row.timestamp, old_value.value, new_value.value
+            )
+            for old_row, new_row in zip(old, new)
+            for index, (old_value, new_value) in enumerate(
+                zip(old_row.statuses, new_row.statuses)
+            )
+            if old_value.value != new_value.value
+        ]
+
+        self.assertNotEqual(expected, [])
+        self.assertEqual(old.diff(new), expected)
+        self.assertEqual(new.diff(new), [])
+
+        # Only days in both tables are compared.
+        later = eetlijst.parse_statuses(
+            bench.generate_page(
+                days=10, seed=2, start=old[0].timestamp + timedelta(days=5)
+            )
+        )
+
+        self.assertTrue(
+            all(change.timestamp >= later[0].timestamp for change in old.diff(later))
+        )
+
+        # The status table is not parsed again if it did not change.
+        content = bench.generate_page(days=10, seed=1)
+        snapshot = eetlijst.parse_main_page(content)
+
+        self.assertEqual(old.fingerprint, snapshot.statuses.fingerprint)
+        self.assertNotEqual(old.fingerprint, new.fingerprint)
+
+        content = content.replace(b"Benchmark", b"Changed")
+        other = eetlijst.parse_main_page(content, previous=snapshot)
+
+        self.assertEqual(other.noticeboard, "Changed")
+        self.assertIs(other.statuses, snapshot.statuses)
+        self.assertEqual(snapshot.diff(other), [])
+
+    def test_parsers(self):
+        """
+        Test that all parser backends yield identical results.
+        """
+
+        def _scrape(filename, parser):
+            self.test_get_response = [
+                MockResponse.from_file(
+                    filename,
+                    url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+                )
+            ]
+
+            client = eetlijst.Eetlijst(
+                username="test",
+                password="test",
+                transport=self.transport,
+                parser=parser,
+            )
+
+            return (
+                client.get_name(),
+                client.get_residents(),
+                client.get_noticeboard(),
+                [
+                    (
+                        row.timestamp,
+                        row.deadline,
+                        [(x.value, x.last_changed) for x in row.statuses],
+                    )
+                    for row in client.get_statuses()
+                ],
+            )
+
+        for filename in [
+            "test_main.html",
+            "test_main2.html",
+            "test_main3.html",
+            "test_main4.html",
+        ]:
+            expected = _scrape(filename, "html.parser")
+
+            for parser in eetlijst.PARSERS:
+                with self.subTest(filename=filename, parser=parser):
+                    if parser in ("lxml", "html5lib"):
+                        if importlib.util.find_spec(parser) is None:
+                            self.skipTest("%s is not installed" % parser)
+
+                    self.assertEqual(_scrape(filename, parser), expected)
+
+    def test_parsers_fallback(self):
+        """
+        Test parser backend selection and fallback.
+        """
+
+        self.assertEqual(eetlijst.get_parser("fast"), "fast")
+
+        with mock.patch("importlib.util.find_spec", return_value=None):
+            self.assertEqual(eetlijst.get_parser("lxml"), "html.parser")
+
+        with self.assertRaises(ValueError):
+            eetlijst.get_parser("invalid")
+
     def test_statuses_get(self):
         """
         Test getting status for specific dates
         """
 
-        # TODO
-        pass
+        content = bench.generate_page(start=eetlijst.now() + timedelta(days=1))
+        rows = eetlijst.parse_statuses(content)
+
+        self.test_get_response = [
+            MockResponse(content, url=eetlijst.BASE_URL + "main.php?session_id=1")
+        ]
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
+
+        for row in rows:
+            for index, status in enumerate(row.statuses):
+                self.assertEqual(client.get_status(index, row.timestamp), status.value)
+
+        with self.assertRaises(ValueError):
+            client.get_status(0, rows[-1].timestamp + timedelta(days=1))
+
+        with self.assertRaises(ValueError):
+            client.get_status(0, datetime(2014, 3, 28, tzinfo=eetlijst.TZ_UTC))
+
+        self.assertEqual(self.counter, 1)
 
     def test_statuses_set(self):
         """
         Test setting status for specific date
         """
 
-        # TODO
-        pass
+        content = bench.generate_page(start=eetlijst.now() + timedelta(days=1))
+        timestamp = eetlijst.parse_statuses(content)[0].timestamp
+
+        self.test_get_response = [
+            MockResponse(content, url=eetlijst.BASE_URL + "main.php?session_id=1")
+        ]
+        self.test_post_response = [
+            MockResponse(content, url=eetlijst.BASE_URL + "main.php?session_id=1")
+        ] * 4
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
+        verified = client.set_status(2, -5, timestamp)
+
+        # The page does not change, so verification only succeeds if the value
+        # already was set.
+        self.assertEqual(
+            verified, eetlijst.parse_statuses(content)[0].statuses[2].value == -5
+        )
+        self.assertEqual([data["what"] for data in self.posted], [-3, -4, -4])
+        self.assertEqual(self.posted[0]["who"], 2)
+        self.assertEqual(self.posted[0]["day[]"], [int(timestamp.timestamp())])
+        self.assertEqual(self.counter, 4)
+
+        # An unknown resident is not verified.
+        self.assertFalse(client.set_status(99, 1, timestamp))
+
+    def test_statuses_set_many(self):
+        """
+        Test setting many statuses with a minimal number of requests.
+        """
+
+        content = bench.generate_page(start=eetlijst.now() + timedelta(days=1))
+        rows = eetlijst.parse_statuses(content)
+
+        self.test_get_response = [
+            MockResponse(content, url=eetlijst.BASE_URL + "main.php?session_id=1")
+        ]
+        self.test_post_response = [
+            MockResponse(content, url=eetlijst.BASE_URL + "main.php?session_id=1")
+        ] * 4
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=self.transport
+        )
+        value = rows[0].statuses[0].value
+        other = 0 if rows[1].statuses[1].value != 0 else -1
+        updates = client.set_statuses(
+            [
+                (0, rows[0].timestamp, value),
+                (1, rows[1].timestamp, other),
+                (1, rows[2].timestamp, other),
+                (3, rows[1].timestamp, 4),
+            ]
+        )
+
+        self.assertEqual([update.skipped for update in updates], [True] + [False] * 3)
+        self.assertTrue(all(update.succeeded() for update in updates))
+
+        # One request for resident 1 on two days, and two for resident 3.
+        self.assertEqual(len(self.posted), 3)
+        self.assertEqual(
+            self.posted[0]["day[]"],
+            [int(rows[1].timestamp.timestamp()), int(rows[2].timestamp.timestamp())],
+        )
+        self.assertEqual([data["what"] for data in self.posted[1:]], [3, 4])
+        self.assertEqual(self.counter, 4)
+
+    def test_statuses_set_write_through(self):
+        """
+        Test that writes are applied to the cached page, and verified lazily.
+        """
+
+        content = bench.generate_page(start=eetlijst.now() + timedelta(days=1))
+        row = eetlijst.parse_statuses(content)[1]
+        value = row.statuses[2].value
+        other = 4 if value != 4 else 3
+
+        self.test_get_response = [
+            MockResponse(content, url=eetlijst.BASE_URL + "main.php?session_id=1")
+        ]
+        self.test_post_response = [
+            MockResponse(content, url=eetlijst.BASE_URL + "main.php?session_id=1")
+        ] * 8
+
+        client = eetlijst.Eetlijst(
+            username="test",
+            password="test",
+            transport=self.transport,
+            write_through=True,
+        )
+        client.get_statuses()
+
+        # The page returned by the server is not parsed.
+        with mock.patch("eetlijst.client.parse_main_page") as parse_main_page:
+            self.assertTrue(client.set_status(2, other, row.timestamp))
+            self.assertEqual(client.get_status(2, row.timestamp), other)
+
+            client.set_noticeboard("Write-through")
+            self.assertEqual(client.get_noticeboard(), "Write-through")
+
+        parse_main_page.assert_not_called()
+
+        # The server did not apply the changes.
+        self.assertFalse(client.verify())
+        self.assertEqual(client.get_status(2, row.timestamp), value)
+        self.assertTrue(client.verify())
+
+        self.assertTrue(client.set_status(2, value, row.timestamp))
+        self.assertTrue(client.verify())
+
+        # Changes for an unknown resident cannot be applied, nor verified.
+        self.assertFalse(client.set_status(99, 1, row.timestamp))
+        self.assertEqual(self.counter, 1 + len(self.posted))
@@ -0,0 +1,104 @@
+import threading
+import time
+import unittest
+
+import eetlijst
+from eetlijst.pool import EetlijstPool, RateLimiter
+
+from .test_module import MockResponse
+
+
+class MockTransport(eetlijst.Transport):
+    """
+    Transport that serves a fixed page for every session, and keeps track of
+    the number of requests in flight.
+    """
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get(self, url, params=None):
+        with self.lock:
+            self.counter += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.delay)
+
+        with self.lock:
+            self.in_flight -= 1
+
+        if url.endswith("login.php"):
+            return MockResponse("", url=eetlijst.BASE_URL + "login.php?r=failed")
+
+        return MockResponse.from_file(
+            "test_main.html",
+            url=eetlijst.BASE_URL + "main.php?session_id=" + params["session_id"],
+        )
+
+
+class EetlijstPoolTest(unittest.TestCase):
+    """
+    Test cases for the multi-account pool.
+    """
+
+    def test_statuses_all(self):
+        """
+        Test that statuses are retrieved for all accounts, with a bounded
+        number of requests in flight.
+        """
+
+        transport = MockTransport()
+        accounts = {
+            "house%d" % index: {"session_id": "%032d" % index} for index in range(12)
+        }
+
+        with EetlijstPool(
+            accounts, transport=transport, max_in_flight=3, max_workers=12
+        ) as pool:
+            results = pool.get_statuses_all(limit=1)
+
+        self.assertEqual(list(results), list(accounts))
+        self.assertEqual(transport.counter, 12)
+        self.assertEqual(transport.max_in_flight, 3)
+
+        for rows in results.values():
+            self.assertEqual(len(rows), 1)
+            self.assertEqual(len(rows[0].statuses), 5)
+
+    def test_return_exceptions(self):
+        """
+        Test that a failing account does not affect the other accounts.
+        """
+
+        pool = EetlijstPool(transport=MockTransport(delay=0))
+        pool.add("house", session_id="%032d" % 1)
+        pool.add("invalid", username="test", password="invalid")
+
+        with self.assertRaises(KeyError):
+            pool.add("house", session_id="%032d" % 2)
+
+        results = pool.get_names_all(return_exceptions=True)
+
+        self.assertEqual(results["house"], "Python-eetlijst")
+        self.assertIsInstance(results["invalid"], eetlijst.LoginError)
+
+        with self.assertRaises(eetlijst.LoginError):
+            pool.get_names_all()
+
+    def test_rate_limiter(self):
+        """
+        Test that calls are spaced evenly.
+        """
+
+        rate_limiter = RateLimiter(rate=50)
+        start = time.monotonic()
+
+        for _ in range(6):
+            rate_limiter.acquire()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
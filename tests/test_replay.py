@@ -0,0 +1,185 @@
+import os
+import tempfile
+import time
+import unittest
+
+import eetlijst
+from eetlijst import bench
+from eetlijst.replay import (
+    Cassette,
+    Exchange,
+    RecordingTransport,
+    ReplayServer,
+    ReplayTransport,
+)
+
+from .test_module import MockResponse, MockTransport
+
+SESSION_ID = "bc731753a2d0fecccf12518759108b5b"
+
+
+def cassette():
+    content = MockResponse.from_file("test_main.html").content.encode("utf-8")
+    url = "main.php?session_id=" + SESSION_ID
+
+    return Cassette(
+        [
+            Exchange("GET", "login.php", 200, url, {}, content),
+            Exchange("GET", "main.php", 200, url, {}, content),
+            Exchange("POST", "main.php", 200, url, {}, content),
+        ]
+    )
+
+
+class ReplayTest(unittest.TestCase):
+    """
+    Test cases for recording and replaying exchanges.
+    """
+
+    def setUp(self):
+        self.timeouts = (eetlijst.TIMEOUT_SESSION, eetlijst.TIMEOUT_CACHE)
+
+    def tearDown(self):
+        eetlijst.TIMEOUT_SESSION, eetlijst.TIMEOUT_CACHE = self.timeouts
+
+    def test_record(self):
+        """
+        Test that exchanges are recorded without request parameters, and that
+        cassettes can be saved and loaded.
+        """
+
+        response = MockResponse.from_file(
+            "test_main.html", url=eetlijst.BASE_URL + "main.php?session_id=1"
+        )
+        transport = RecordingTransport(
+            MockTransport(get=lambda url, **kwargs: response, post=None)
+        )
+
+        client = eetlijst.Eetlijst(
+            username="test", password="secret", transport=transport
+        )
+        client.get_name()
+
+        exchange = transport.cassette.exchanges[0]
+
+        self.assertEqual(len(transport.cassette), 1)
+        self.assertEqual((exchange.method, exchange.path), ("GET", "login.php"))
+        self.assertEqual(exchange.url, "main.php?session_id=1")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cassette.json")
+            transport.cassette.save(path)
+
+            with open(path, "r") as fp:
+                self.assertNotIn("secret", fp.read())
+
+            loaded = Cassette.load(path)
+
+        self.assertEqual(loaded.exchanges[0].content, exchange.content)
+        self.assertEqual(loaded.exchanges[0].url, exchange.url)
+
+    def test_record_login_failed(self):
+        """
+        Test that query parameters other than the session identifier are not
+        recorded, e.g. when a login is not redirected.
+        """
+
+        response = MockResponse.from_file(
+            "test_login_failed.html",
+            status_code=500,
+            url=eetlijst.BASE_URL + "login.php?login=alice&pass=s3cret&r=1",
+        )
+        transport = RecordingTransport(
+            MockTransport(get=lambda url, **kwargs: response, post=None)
+        )
+
+        client = eetlijst.Eetlijst(
+            username="alice", password="s3cret", transport=transport
+        )
+
+        with self.assertRaises(eetlijst.Error):
+            client.get_name()
+
+        exchange = transport.cassette.exchanges[0]
+
+        self.assertEqual(exchange.url, "login.php?r=1")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cassette.json")
+            transport.cassette.save(path)
+
+            with open(path, "r") as fp:
+                content = fp.read()
+
+        self.assertNotIn("s3cret", content)
+        self.assertNotIn("alice", content)
+
+    def test_replay(self):
+        """
+        Test that a client can be served from memory.
+        """
+
+        client = eetlijst.Eetlijst(
+            username="test", password="test", transport=ReplayTransport(cassette())
+        )
+
+        self.assertEqual(client.get_name(), "Python-eetlijst")
+        self.assertEqual(client.session[0], SESSION_ID)
+
+    def test_server(self):
+        """
+        Test that a client can be served over HTTP, with errors injected.
+        """
+
+        eetlijst.TIMEOUT_CACHE = 0
+
+        with ReplayServer(cassette(), error_rate=0.3, seed=1) as server:
+            client = eetlijst.Eetlijst(
+                username="test",
+                password="test",
+                transport=server.transport(backoff_factor=0, max_retries=10),
+            )
+
+            for _ in range(5):
+                self.assertEqual(len(client.get_statuses()), 7)
+
+        self.assertEqual(server.stats["logins"], 1)
+        self.assertGreater(server.stats["errors"], 0)
+
+        # The login, its redirect and one page per call, plus the retries.
+        self.assertEqual(server.stats["requests"] - server.stats["errors"], 7)
+
+    def test_server_expiry(self):
+        """
+        Test that expired sessions are renewed by the client.
+        """
+
+        eetlijst.TIMEOUT_CACHE = 0
+
+        with ReplayServer(cassette(), session_lifetime=0.2) as server:
+            client = eetlijst.Eetlijst(
+                username="test", password="test", transport=server.transport()
+            )
+            client.get_statuses()
+            session_id = client.session[0]
+
+            time.sleep(0.3)
+            client.get_statuses()
+
+        self.assertNotEqual(client.session[0], session_id)
+        self.assertEqual(server.stats["logins"], 2)
+        self.assertEqual(server.stats["expired"], 1)
+
+    def test_measure_replay(self):
+        """
+        Test the load test benchmark.
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cassette.json")
+            cassette().save(path)
+
+            result = bench.measure_replay(path, clients=2, operations=2, latency=0)
+
+        self.assertEqual(result["operations"], 4)
+        self.assertEqual(result["server"]["logins"], 2)
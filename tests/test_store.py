@@ -0,0 +1,153 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import eetlijst
+
+from .test_module import MockResponse, MockTransport
+
+
+class StoreTest(unittest.TestCase):
+    """
+    Test cases for the cache and session stores.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def stores(self):
+        return {
+            "memory": eetlijst.MemoryStore(),
+            "file": eetlijst.FileStore(os.path.join(self.directory.name, "cache")),
+            "sqlite": eetlijst.SQLiteStore(
+                os.path.join(self.directory.name, "cache.db")
+            ),
+        }
+
+    def test_stores(self):
+        """
+        Test the basic operations of all stores.
+        """
+
+        for name, store in self.stores().items():
+            with self.subTest(store=name):
+                self.assertIsNone(store.get("a/b"))
+
+                with self.assertRaises(KeyError):
+                    store["a/b"]
+
+                store["a/b"] = ("content", 1)
+                store.set("a/c", [1, 2])
+                store.set("b/a", None)
+
+                self.assertEqual(store["a/b"], ("content", 1))
+                self.assertIsNone(store.get("b/a", "default"))
+
+                store.delete("a/c")
+                store.delete("a/c")
+                self.assertEqual(store.get("a/c", "default"), "default")
+
+                store.clear("a/")
+                self.assertIsNone(store.get("a/b"))
+                self.assertIsNone(store.get("b/a", "default"))
+
+    def test_namespace(self):
+        """
+        Test that namespaces do not overlap.
+        """
+
+        for name, store in self.stores().items():
+            with self.subTest(store=name):
+                first = store.namespace("first:")
+                second = store.namespace("second:")
+
+                first["session"] = "1"
+                second["session"] = "2"
+                first.clear()
+
+                self.assertIsNone(first.get("session"))
+                self.assertEqual(second["session"], "2")
+
+    def test_shared(self):
+        """
+        Test that a second client, e.g. in another process, reuses the session
+        and parsed page of the first client.
+        """
+
+        counter = []
+
+        def patched_get(url, *args, **kwargs):
+            counter.append(url)
+            return MockResponse.from_file(
+                "test_main.html",
+                url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+            )
+
+        transport = MockTransport(get=patched_get, post=None)
+
+        for name in ("file", "sqlite"):
+            with self.subTest(store=name):
+                del counter[:]
+
+                client = eetlijst.Eetlijst(
+                    username="test",
+                    password="test",
+                    transport=transport,
+                    store=self.stores()[name],
+                )
+                self.assertEqual(client.get_name(), "Python-eetlijst")
+                self.assertEqual(len(counter), 1)
+
+                client = eetlijst.Eetlijst(
+                    username="test",
+                    password="test",
+                    transport=transport,
+                    store=self.stores()[name],
+                )
+                self.assertEqual(
+                    client.get_session_id(), "bc731753a2d0fecccf12518759108b5b"
+                )
+                self.assertEqual(len(client.get_statuses()), 7)
+                self.assertEqual(len(counter), 1)
+
+                # Other accounts do not share the session.
+                client = eetlijst.Eetlijst(
+                    username="other",
+                    password="test",
+                    transport=transport,
+                    store=self.stores()[name],
+                )
+                self.assertIsNone(client.get_session_id())
+
+                client.clear_cache()
+
+    def test_cache_hits(self):
+        """
+        Test that cache hits do not write to the store.
+        """
+
+        def patched_get(url, *args, **kwargs):
+            return MockResponse.from_file(
+                "test_main.html",
+                url="https://www.eetlijst.nl/main.php?session_id=bc731753a2d0fecccf12518759108b5b",  # noqa
+            )
+
+        transport = MockTransport(get=patched_get, post=None)
+
+        for name, store in self.stores().items():
+            with self.subTest(store=name):
+                client = eetlijst.Eetlijst(
+                    username="test", password="test", transport=transport, store=store
+                )
+                client.get_statuses()
+
+                with mock.patch.object(type(store), "set") as set_:
+                    client.get_name()
+                    client.get_statuses()
+                    client.get_noticeboard()
+
+                self.assertEqual(set_.call_count, 0)
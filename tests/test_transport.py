@@ -0,0 +1,115 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import eetlijst
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """
+    Request handler that echoes the request path and cookies, and keeps track
+    of the number of connections opened by clients. Requests for login.php set
+    a cookie.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests += 1
+
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = self.path.encode("ascii")
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("X-Cookie", self.headers.get("Cookie", ""))
+
+        if self.path.startswith("/login.php"):
+            self.send_header("Set-Cookie", "PHPSESSID=1; Path=/")
+
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class RequestsTransportTest(unittest.TestCase):
+    """
+    Test cases for the `RequestsTransport', against a local HTTP server.
+    """
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), CountingHandler)
+        self.server.connections = 0
+        self.server.requests = 0
+        self.server.failures = 0
+
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+        self.url = "http://127.0.0.1:%d/" % self.server.server_port
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_keep_alive(self):
+        """
+        Test that subsequent requests reuse one connection.
+        """
+
+        transport = eetlijst.RequestsTransport()
+
+        for _ in range(3):
+            response = transport.get(self.url + "main.php", params={"a": 1})
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, b"/main.php?a=1")
+
+        transport.close()
+
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_retry(self):
+        """
+        Test that failed GET requests are retried.
+        """
+
+        self.server.failures = 2
+        transport = eetlijst.RequestsTransport(max_retries=3, backoff_factor=0)
+
+        response = transport.get(self.url + "main.php")
+        transport.close()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_cookies(self):
+        """
+        Test that cookies are not sent with subsequent requests, so that a
+        transport can be shared by clients of different accounts.
+        """
+
+        transport = eetlijst.RequestsTransport(keep_alive=False)
+
+        response = transport.get(self.url + "login.php")
+        self.assertIn("PHPSESSID", response.headers["Set-Cookie"])
+
+        response = transport.get(self.url + "main.php")
+        transport.close()
+
+        self.assertEqual(response.headers["X-Cookie"], "")
+        self.assertEqual(len(transport.session.cookies), 0)
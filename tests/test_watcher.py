@@ -0,0 +1,171 @@
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import eetlijst
+from eetlijst import bench
+from eetlijst.watcher import Watcher
+
+from .test_module import MockResponse, MockTransport
+
+START = datetime(2022, 11, 14, 15, tzinfo=eetlijst.TZ_UTC)
+
+
+class MockClient(object):
+    """
+    Client that returns the given snapshots, one per call.
+    """
+
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+
+    def get_snapshot(self):
+        return self.snapshots.pop(0)
+
+
+def snapshot(seed=0, noticeboard="Benchmark"):
+    content = bench.generate_page(days=3, seed=seed, start=START)
+    content = content.replace(b"Benchmark", noticeboard.encode())
+
+    return eetlijst.parse_main_page(content)
+
+
+class WatcherTest(unittest.TestCase):
+    """
+    Test cases for the watcher.
+    """
+
+    def test_events(self):
+        """
+        Test that changes since the previous poll are emitted once.
+        """
+
+        old = snapshot(seed=1)
+        new = snapshot(seed=2, noticeboard="Changed")
+        watcher = Watcher(MockClient(old, new, new))
+        events = []
+
+        for kind in ("status", "noticeboard", "deadline"):
+            watcher.on(kind, events.append)
+
+        with self.assertRaises(ValueError):
+            watcher.on("invalid", events.append)
+
+        with mock.patch("eetlijst.watcher.now") as now:
+            now.return_value = START - timedelta(minutes=1)
+            watcher.run(iterations=1)
+            self.assertEqual(events, [])
+
+            now.return_value = START + timedelta(minutes=1)
+            watcher.run(iterations=1)
+
+            now.return_value = START + timedelta(minutes=2)
+            watcher.run(iterations=1)
+
+        kinds = [event.kind for event in events]
+        changes = old.diff(new)
+
+        self.assertEqual(kinds.count("status"), len(changes))
+        self.assertEqual(kinds.count("noticeboard"), 1)
+        self.assertEqual(kinds.count("deadline"), 1)
+
+        event = events[kinds.index("deadline")]
+        self.assertEqual(event.timestamp, START)
+
+        event = events[kinds.index("noticeboard")]
+        self.assertEqual((event.old, event.new), ("Benchmark", "Changed"))
+
+    def test_errors(self):
+        """
+        Test that errors are passed to callbacks, if registered.
+        """
+
+        client = mock.Mock()
+        client.get_snapshot.side_effect = eetlijst.SessionError("Test")
+        watcher = Watcher(client)
+
+        with self.assertRaises(eetlijst.SessionError):
+            watcher.run(iterations=1)
+
+        events = []
+        watcher.on("error", events.append)
+        watcher.run(iterations=1)
+
+        self.assertIsInstance(events[0].new, eetlijst.SessionError)
+
+    def test_next_interval(self):
+        """
+        Test that polling is adaptive.
+        """
+
+        watcher = Watcher(MockClient(snapshot()), near_deadline=3600)
+        watcher.poll()
+
+        # Between 16:00 and 17:00 in Amsterdam, the deadline is at 16:00.
+        self.assertEqual(watcher.next_interval(START - timedelta(minutes=30)), 60)
+        self.assertEqual(watcher.next_interval(START - timedelta(seconds=10)), 10)
+        self.assertEqual(watcher.next_interval(START - timedelta(hours=2)), 300)
+        self.assertEqual(
+            watcher.next_interval(START - timedelta(hours=1, minutes=2)), 120
+        )
+
+        # At night, in Amsterdam.
+        night = START.replace(hour=1) + timedelta(days=1)
+        self.assertEqual(watcher.next_interval(night), 1800)
+
+    def test_client(self):
+        """
+        Test that changes are seen by a client that polls more often than its
+        cached page expires.
+        """
+
+        pages = [
+            bench.generate_page(days=3, seed=1, start=START),
+            bench.generate_page(days=3, seed=2, start=START),
+        ]
+        urls = []
+
+        def get(url, **kwargs):
+            urls.append(url)
+            return MockResponse(
+                pages[min(len(urls), len(pages)) - 1],
+                url=eetlijst.BASE_URL + "main.php?session_id=1",
+            )
+
+        client = eetlijst.Eetlijst(
+            session_id="1", transport=MockTransport(get=get, post=None)
+        )
+        watcher = Watcher(client)
+        events = []
+        timeout_cache = eetlijst.TIMEOUT_CACHE
+
+        try:
+            eetlijst.TIMEOUT_CACHE = 0.2
+
+            for _ in range(10):
+                events.extend(watcher.poll())
+                time.sleep(0.05)
+        finally:
+            eetlijst.TIMEOUT_CACHE = timeout_cache
+
+        self.assertGreaterEqual(len(urls), 2)
+        self.assertIn("status", [event.kind for event in events])
+
+
+class WatcherAsyncTest(unittest.IsolatedAsyncioTestCase):
+    """
+    Test cases for the asynchronous interface of the watcher.
+    """
+
+    async def test_watch(self):
+        """
+        Test that events can be consumed using an async iterator.
+        """
+
+        watcher = Watcher(MockClient(snapshot(), snapshot(noticeboard="Changed")))
+
+        with mock.patch.object(Watcher, "next_interval", return_value=0):
+            async for event in watcher:
+                self.assertEqual(event.kind, "noticeboard")
+                watcher.stop()